@@ -0,0 +1,44 @@
+"""
+Measures GET /headers end to end with tokens verified against a local key file
+
+Run with `python bench_auth.py`. No access to Auth0 is needed: the token is signed with a key generated
+on the fly and its public key is written to a temporary file used as AUTH_KEY_FILE.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import timeit
+
+from auth_core.testing import LocalSigningKey
+
+REQUESTS = 1000
+
+
+def main():
+    key = LocalSigningKey()
+    with tempfile.NamedTemporaryFile('w', suffix='.pem', delete=False) as key_file:
+        key_file.write(key.public_pem)
+    os.environ.setdefault('AUTH0_DOMAIN', 'example.auth0.com')
+    os.environ.setdefault('API_AUDIENCE', 'image')
+    os.environ['AUTH_KEY_FILE'] = key_file.name
+
+    import app
+    from auth_core import VerifiedTokenCache
+
+    token = key.mint(iss=f'https://{app.AUTH0_DOMAIN}/', aud=app.API_AUDIENCE, sub='bench|1')
+    client = app.app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    for label, cache_size in (('without token cache', 0), ('with token cache', 1024)):
+        app.verifier.token_cache = VerifiedTokenCache(cache_size)
+        # The view prints the payload, keep it out of the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = timeit.timeit(lambda: client.get('/headers', headers=headers), number=REQUESTS)
+        print(f'{label:>20}: {seconds / REQUESTS * 1e6:9.1f} us/request')
+
+    os.unlink(key_file.name)
+
+
+if __name__ == '__main__':
+    main()
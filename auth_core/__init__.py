@@ -0,0 +1,13 @@
+"""
+Bearer token verification shared by the Flask apps in this repository
+
+Much of this started out in BasicFlaskAuth. Keys come from a pluggable key source, so a service
+can verify tokens without any network I/O at request time and tests can mint their own tokens
+(see auth_core.testing).
+"""
+from .errors import AuthHeaderMissing, AuthHeaderInvalid, PermissionsNotFound, TokenExpired, KeySetUnavailable
+from .jwks import JWKSCache, JWKSFetchError
+from .key_sources import StaticKeySource, FileKeySource
+from .permissions import PermissionRequirement, VerifiedPayload, permission_table
+from .token_cache import VerifiedTokenCache
+from .verifier import TokenVerifier, get_token_auth_header, check_permissions
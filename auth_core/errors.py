@@ -0,0 +1,26 @@
+from werkzeug.exceptions import BadRequest, Unauthorized, ServiceUnavailable
+
+
+class TokenExpired(BadRequest):
+    message = 'token_expired'
+    description = 'Token has expired'
+
+
+class PermissionsNotFound(BadRequest):
+    message = 'no_permissions'
+    description = 'Permissions not included in JWT.'
+
+
+class AuthHeaderMissing(Unauthorized):
+    message = 'authorization_header_missing'
+    description = 'Authorization header is expected.'
+
+
+class AuthHeaderInvalid(BadRequest):
+    message = 'invalid_header'
+    description = 'Authorization header must start with "Bearer".'
+
+
+class KeySetUnavailable(ServiceUnavailable):
+    message = 'jwks_unavailable'
+    description = 'Unable to fetch the signing keys. Please try again later.'
@@ -0,0 +1,118 @@
+import json
+import logging
+import threading
+import time
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSFetchError(Exception):
+    """
+    Raised when the key set could not be fetched and there is nothing cached to fall back on
+    """
+
+
+class JWKSCache:
+    """
+    Process-wide cache of the JSON Web Key Set published by the identity provider
+
+    * Keys are kept for `ttl` seconds. Once they are stale they are still served while a
+      single background thread fetches a new copy (stale-while-revalidate).
+    * Only one fetch is in flight at a time. Threads that miss while a fetch is running
+      wait for it and reuse its result instead of starting their own.
+    * A token with an unknown `kid` forces a refresh, at most once every
+      `min_refresh_interval` seconds, so signing key rotations are picked up right away
+      without letting random kids hammer the identity provider.
+    """
+
+    def __init__(self, url, ttl=600, min_refresh_interval=30, timeout=5):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self.fetch_count = 0
+
+        self._keys = None
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        # Number of completed fetch attempts, lets waiting threads tell that a fetch happened meanwhile
+        self._attempt = 0
+        self._refresh_lock = threading.Lock()
+
+    def get_key(self, kid):
+        """
+        Returns the JWK with the given key ID, or None if the key set does not contain it
+        """
+        if self._keys is None:
+            self.refresh()
+        elif self.is_stale() and self._may_refresh():
+            self._revalidate_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._may_refresh():
+            self.refresh()
+            key = self._keys.get(kid)
+
+        return key
+
+    def is_stale(self):
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    def refresh(self):
+        """
+        Fetches the key set, blocking until it is available
+
+        If another thread is already fetching, waits for that fetch instead of starting a new one.
+        """
+        attempt = self._attempt
+        with self._refresh_lock:
+            if self._attempt == attempt:
+                self._fetch()
+
+        if self._keys is None:
+            raise JWKSFetchError(f'Unable to fetch the key set from {self.url}')
+
+    def load(self, jwks):
+        """
+        Replaces the cached keys with an already parsed key set
+        """
+        self._keys = {key['kid']: key for key in jwks.get('keys', []) if 'kid' in key}
+        self._fetched_at = time.monotonic()
+
+    def clear(self):
+        with self._refresh_lock:
+            self._keys = None
+            self._fetched_at = 0.0
+            self._attempted_at = 0.0
+
+    def _revalidate_in_background(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def revalidate():
+            try:
+                self._fetch()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=revalidate, name='jwks-revalidate', daemon=True).start()
+
+    def _may_refresh(self):
+        return time.monotonic() - self._attempted_at >= self.min_refresh_interval
+
+    def _fetch(self):
+        """
+        Downloads the key set. Must be called while holding the refresh lock.
+        """
+        self._attempted_at = time.monotonic()
+        try:
+            with urlopen(self.url, timeout=self.timeout) as jsonurl:
+                jwks = json.loads(jsonurl.read())
+            self.fetch_count += 1
+            self.load(jwks)
+        except Exception:
+            logger.exception('Unable to fetch the key set from %s', self.url)
+        finally:
+            self._attempt += 1
@@ -0,0 +1,44 @@
+import json
+
+
+class StaticKeySource:
+    """
+    Verification keys held in memory, e.g. test keys or keys loaded at startup
+
+    `keys` is either a JSON Web Key Set ({'keys': [...]}) or a mapping of key ID -> key,
+    where a key is a JWK dict or a PEM string.
+    """
+
+    def __init__(self, keys):
+        if 'keys' in keys and isinstance(keys['keys'], list):
+            keys = {key['kid']: key for key in keys['keys'] if 'kid' in key}
+        self._keys = dict(keys)
+
+    def get_key(self, kid):
+        return self._keys.get(kid)
+
+
+class FileKeySource(StaticKeySource):
+    """
+    Verification keys read once from a local JWKS (JSON) or PEM public key file
+
+    A PEM file holds a single key. It is used for tokens signed with `kid`, or for any token if `kid` is None.
+    """
+
+    def __init__(self, path, kid=None):
+        self.path = path
+        with open(path) as key_file:
+            contents = key_file.read()
+
+        if contents.lstrip().startswith('-----BEGIN'):
+            self._pem = contents
+            self._kid = kid
+            super().__init__({})
+        else:
+            self._pem = None
+            super().__init__(json.loads(contents))
+
+    def get_key(self, kid):
+        if self._pem is not None:
+            return self._pem if self._kid is None or self._kid == kid else None
+        return super().get_key(kid)
@@ -0,0 +1,58 @@
+# Permissions required by each route, filled in as routes are decorated with requires_auth
+route_permissions = {}
+
+
+class PermissionRequirement:
+    """
+    The permissions a route requires, compiled once when the route is decorated
+
+    A token satisfies the requirement if it grants every permission in `all_of`
+    and, when `any_of` is not empty, at least one permission in `any_of`.
+    """
+
+    def __init__(self, all_of=(), any_of=()):
+        self.all_of = frozenset(all_of)
+        self.any_of = frozenset(any_of)
+
+    @classmethod
+    def compile(cls, permission='', all_of=(), any_of=()):
+        all_of = set(all_of)
+        if permission:
+            all_of.add(permission)
+        return cls(all_of=all_of, any_of=any_of)
+
+    def is_satisfied_by(self, granted):
+        """
+        Checks a frozenset of granted permissions against the requirement
+        """
+        return self.all_of <= granted and (not self.any_of or not self.any_of.isdisjoint(granted))
+
+    def format(self):
+        return {
+            'all_of': sorted(self.all_of),
+            'any_of': sorted(self.any_of)
+        }
+
+    def __repr__(self):
+        return f'PermissionRequirement(all_of={sorted(self.all_of)}, any_of={sorted(self.any_of)})'
+
+
+class VerifiedPayload(dict):
+    """
+    A verified token payload carrying its granted permissions as a frozenset
+    """
+
+    def __init__(self, claims):
+        super().__init__(claims)
+        self.permission_set = frozenset(claims.get('permissions', ()))
+
+
+def register_route(endpoint, requirement):
+    route_permissions[endpoint] = requirement
+
+
+def permission_table():
+    """
+    Returns the compiled route -> permission table, for auditing
+    """
+    return {endpoint: requirement.format() for endpoint, requirement in sorted(route_permissions.items())}
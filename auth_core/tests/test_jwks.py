@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from auth_core.jwks import JWKSCache, JWKSFetchError
+
+
+class StubJWKSServer:
+    """A local stand-in for the identity provider's /.well-known/jwks.json"""
+
+    def __init__(self, kids=('key-1',), delay=0):
+        self.kids = list(kids)
+        self.delay = delay
+        self.available = True
+        self.requests = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if not stub.available:
+                    self.send_error(503)
+                    return
+
+                body = json.dumps({
+                    'keys': [{'kty': 'RSA', 'kid': kid, 'use': 'sig', 'n': 'n', 'e': 'AQAB'} for kid in stub.kids]
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/.well-known/jwks.json'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JWKSCacheTestCase(unittest.TestCase):
+    """This class represents the key set cache test case"""
+
+    def setUp(self):
+        self.stub = StubJWKSServer()
+
+    def tearDown(self):
+        self.stub.close()
+
+    def test_keys_are_fetched_once_within_ttl(self):
+        cache = JWKSCache(self.stub.url, ttl=60)
+
+        for _ in range(10):
+            self.assertEqual(cache.get_key('key-1')['kid'], 'key-1')
+
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        self.stub.delay = 0.2
+        cache = JWKSCache(self.stub.url, ttl=60)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get_key('key-1'))) for _ in range(200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 200)
+        self.assertTrue(all(key['kid'] == 'key-1' for key in results))
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_unknown_kid_forces_one_refresh(self):
+        cache = JWKSCache(self.stub.url, ttl=60, min_refresh_interval=0)
+        cache.get_key('key-1')
+
+        self.stub.kids.append('key-2')
+        self.assertEqual(cache.get_key('key-2')['kid'], 'key-2')
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_unknown_kid_refresh_is_throttled(self):
+        cache = JWKSCache(self.stub.url, ttl=60, min_refresh_interval=60)
+        cache.get_key('key-1')
+
+        for _ in range(10):
+            self.assertIsNone(cache.get_key('bogus'))
+
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_stale_keys_are_served_while_revalidating(self):
+        cache = JWKSCache(self.stub.url, ttl=0.3, min_refresh_interval=0)
+        cache.get_key('key-1')
+        time.sleep(0.4)
+
+        self.stub.delay = 0.5
+        started = time.monotonic()
+        self.assertEqual(cache.get_key('key-1')['kid'], 'key-1')
+        self.assertLess(time.monotonic() - started, 0.25)
+
+        time.sleep(0.6)
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_stale_keys_survive_an_outage(self):
+        cache = JWKSCache(self.stub.url, ttl=0, min_refresh_interval=0)
+        cache.get_key('key-1')
+
+        self.stub.available = False
+        cache.refresh()
+        self.assertEqual(cache.get_key('key-1')['kid'], 'key-1')
+
+    def test_fetch_error_without_cached_keys(self):
+        self.stub.available = False
+        cache = JWKSCache(self.stub.url)
+
+        with self.assertRaises(JWKSFetchError):
+            cache.get_key('key-1')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from auth_core.permissions import PermissionRequirement, VerifiedPayload
+
+
+class PermissionRequirementTestCase(unittest.TestCase):
+    """This class represents the compiled permission test case"""
+
+    def setUp(self):
+        self.payload = VerifiedPayload({'permissions': ['get:drinks-detail', 'post:drinks']})
+
+    def test_payload_carries_a_permission_set(self):
+        self.assertEqual(self.payload.permission_set, frozenset(['get:drinks-detail', 'post:drinks']))
+        self.assertEqual(self.payload['permissions'], ['get:drinks-detail', 'post:drinks'])
+
+    def test_single_permission(self):
+        self.assertTrue(PermissionRequirement.compile('post:drinks').is_satisfied_by(self.payload.permission_set))
+        self.assertFalse(PermissionRequirement.compile('patch:drinks').is_satisfied_by(self.payload.permission_set))
+
+    def test_all_of(self):
+        requirement = PermissionRequirement.compile(all_of=['get:drinks-detail', 'post:drinks'])
+        self.assertTrue(requirement.is_satisfied_by(self.payload.permission_set))
+
+        requirement = PermissionRequirement.compile('patch:drinks', all_of=['get:drinks-detail'])
+        self.assertFalse(requirement.is_satisfied_by(self.payload.permission_set))
+
+    def test_any_of(self):
+        requirement = PermissionRequirement.compile(any_of=['patch:drinks', 'post:drinks'])
+        self.assertTrue(requirement.is_satisfied_by(self.payload.permission_set))
+
+        requirement = PermissionRequirement.compile(any_of=['patch:drinks', 'delete:drinks'])
+        self.assertFalse(requirement.is_satisfied_by(self.payload.permission_set))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
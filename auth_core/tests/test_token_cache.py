@@ -0,0 +1,55 @@
+import time
+import unittest
+
+from auth_core.token_cache import VerifiedTokenCache
+
+
+class VerifiedTokenCacheTestCase(unittest.TestCase):
+    """This class represents the verified token cache test case"""
+
+    def setUp(self):
+        self.payload = {'sub': 'user|1', 'exp': time.time() + 60, 'permissions': ['get:drinks-detail']}
+
+    def test_hit_after_put(self):
+        cache = VerifiedTokenCache()
+        self.assertIsNone(cache.get('token'))
+
+        cache.put('token', self.payload)
+        self.assertIs(cache.get('token'), self.payload)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_entries_expire_with_the_token(self):
+        cache = VerifiedTokenCache()
+        cache.put('token', dict(self.payload, exp=time.time() - 1))
+
+        self.assertIsNone(cache.get('token'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_tokens_without_exp_are_not_cached(self):
+        cache = VerifiedTokenCache()
+        cache.put('token', {'sub': 'user|1'})
+
+        self.assertIsNone(cache.get('token'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.put('a', self.payload)
+        cache.put('b', self.payload)
+        cache.get('a')
+        cache.put('c', self.payload)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_disabled_cache(self):
+        cache = VerifiedTokenCache(maxsize=0)
+        cache.put('token', self.payload)
+
+        self.assertIsNone(cache.get('token'))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+from flask import Flask, jsonify
+from werkzeug.exceptions import HTTPException
+
+from auth_core import (
+    StaticKeySource, FileKeySource, TokenVerifier, VerifiedTokenCache, AuthHeaderInvalid, TokenExpired,
+    permission_table
+)
+from auth_core.testing import LocalSigningKey
+
+AUDIENCE = 'coffee-shop'
+ISSUER = 'https://example.auth0.com/'
+
+
+class TokenVerifierTestCase(unittest.TestCase):
+    """This class represents the token verifier test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.key = LocalSigningKey()
+
+    def setUp(self):
+        self.verifier = TokenVerifier(
+            StaticKeySource(self.key.jwks), algorithms=['RS256'], audience=AUDIENCE, issuer=ISSUER
+        )
+
+    def mint(self, permissions=('get:drinks-detail',), **claims):
+        claims.setdefault('aud', AUDIENCE)
+        claims.setdefault('iss', ISSUER)
+        return self.key.mint(permissions, **claims)
+
+    def test_verify_static_key(self):
+        payload = self.verifier.verify(self.mint())
+
+        self.assertEqual(payload['aud'], AUDIENCE)
+        self.assertEqual(payload.permission_set, frozenset(['get:drinks-detail']))
+
+    def test_verify_is_cached(self):
+        token = self.mint()
+        self.verifier.verify(token)
+        self.verifier.verify(token)
+
+        self.assertEqual(self.verifier.token_cache.stats()['hits'], 1)
+
+    def test_wrong_audience(self):
+        with self.assertRaises(AuthHeaderInvalid):
+            self.verifier.verify(self.mint(aud='someone-else'))
+
+    def test_expired_token(self):
+        with self.assertRaises(TokenExpired):
+            self.verifier.verify(self.mint(expires_in=-60))
+
+    def test_unknown_key(self):
+        other_key = LocalSigningKey(kid='other-key')
+        token = other_key.mint(aud=AUDIENCE, iss=ISSUER)
+
+        with self.assertRaises(AuthHeaderInvalid):
+            self.verifier.verify(token)
+
+    def test_file_key_sources(self):
+        for contents in (self.key.public_pem, json.dumps(self.key.jwks)):
+            with tempfile.NamedTemporaryFile('w', suffix='.key', delete=False) as key_file:
+                key_file.write(contents)
+            try:
+                verifier = TokenVerifier(
+                    FileKeySource(key_file.name), algorithms=['RS256'], audience=AUDIENCE, issuer=ISSUER,
+                    token_cache=VerifiedTokenCache(0)
+                )
+                self.assertEqual(verifier.verify(self.mint())['iss'], ISSUER)
+            finally:
+                os.unlink(key_file.name)
+
+    def test_requires_auth(self):
+        app = Flask(__name__)
+
+        @app.route('/detail')
+        @self.verifier.requires_auth('get:drinks-detail')
+        def detail():
+            return 'ok'
+
+        @app.route('/edit')
+        @self.verifier.requires_auth(any_of=['patch:drinks', 'post:drinks'], pass_payload=True)
+        def edit(payload):
+            return payload['sub']
+
+        @app.errorhandler(HTTPException)
+        def handle_error(e):
+            return jsonify({'code': e.code, 'message': getattr(e, 'message', None)}), e.code
+
+        client = app.test_client()
+        self.assertEqual(client.get('/detail').status_code, 401)
+
+        headers = {'Authorization': f'Bearer {self.mint()}'}
+        self.assertEqual(client.get('/detail', headers=headers).status_code, 200)
+        self.assertEqual(client.get('/edit', headers=headers).status_code, 401)
+
+        headers = {'Authorization': f'Bearer {self.mint(["post:drinks"], sub="manager|1")}'}
+        self.assertEqual(client.get('/edit', headers=headers).data, b'manager|1')
+
+        self.assertEqual(permission_table()['edit'], {'all_of': [], 'any_of': ['patch:drinks', 'post:drinks']})
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
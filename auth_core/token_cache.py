@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature and claims have already been verified
+
+    Entries are keyed by the SHA-256 digest of the token, so the raw bearer tokens are not kept in memory,
+    and expire at the token's `exp` claim. Tokens without an `exp` claim are never cached.
+    A `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """
+        Returns the payload of an already verified token, or None if it has to be verified
+        """
+        if not self.maxsize:
+            self.misses += 1
+            return None
+
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, token, payload):
+        if not self.maxsize or 'exp' not in payload:
+            return
+
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (payload, payload['exp'])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize
+        }
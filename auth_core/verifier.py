@@ -0,0 +1,140 @@
+from functools import wraps
+
+from flask import request
+from jose import jwt
+from werkzeug.exceptions import Unauthorized
+
+from .errors import AuthHeaderMissing, AuthHeaderInvalid, PermissionsNotFound, TokenExpired, KeySetUnavailable
+from .jwks import JWKSFetchError
+from .permissions import PermissionRequirement, VerifiedPayload, register_route
+from .token_cache import VerifiedTokenCache
+
+
+# Auth Header
+def get_token_auth_header():
+    """
+    Obtains the access token from the authorization header
+    """
+    auth = request.headers.get('Authorization', None)
+    if not auth:
+        raise AuthHeaderMissing
+
+    parts = auth.split()
+    if parts[0].lower() != 'bearer':
+        raise AuthHeaderInvalid
+
+    elif len(parts) == 1:
+        raise AuthHeaderInvalid(description='Token not found')
+
+    elif len(parts) > 2:
+        raise AuthHeaderInvalid(description='Authorization header must be bearer token.')
+
+    token = parts[1]
+    return token
+
+
+def check_permissions(permission, payload):
+    """
+    Checks the payload's permissions against a single permission or a compiled PermissionRequirement
+    """
+    if 'permissions' not in payload:
+        raise PermissionsNotFound
+
+    if not isinstance(permission, PermissionRequirement):
+        permission = PermissionRequirement.compile(permission)
+
+    granted = getattr(payload, 'permission_set', None)
+    if granted is None:
+        granted = frozenset(payload['permissions'])
+
+    if not permission.is_satisfied_by(granted):
+        raise Unauthorized(description='Permission not found.')
+    return True
+
+
+class TokenVerifier:
+    """
+    Verifies bearer tokens against the keys of a key source
+
+    A key source is anything with a `get_key(kid)` method returning a JWK dict or PEM string, or None
+    if the key is unknown: JWKSCache for a remote key set, FileKeySource for a local PEM or JWKS file,
+    or StaticKeySource for keys held in memory.
+    """
+
+    def __init__(self, key_source, algorithms, audience, issuer, token_cache=None):
+        self.key_source = key_source
+        self.algorithms = algorithms
+        self.audience = audience
+        self.issuer = issuer
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache()
+
+    def verify(self, token):
+        """
+        Returns the payload of the token, verifying it unless it has already been verified
+        """
+        payload = self.token_cache.get(token)
+        if payload is None:
+            payload = VerifiedPayload(self.decode(token))
+            self.token_cache.put(token, payload)
+        return payload
+
+    def decode(self, token):
+        """
+        Verifies the token's signature and claims against the key source
+        """
+        try:
+            unverified_header = jwt.get_unverified_header(token)
+        except jwt.JWTError:
+            raise AuthHeaderInvalid(description='Unable to parse authentication token.')
+
+        if 'kid' not in unverified_header:
+            raise AuthHeaderInvalid(description='Authorization malformed.')
+
+        try:
+            key = self.key_source.get_key(unverified_header['kid'])
+        except JWKSFetchError:
+            raise KeySetUnavailable
+
+        if not key:
+            raise AuthHeaderInvalid(description='Unable to find the appropriate key.')
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer
+            )
+
+        except jwt.ExpiredSignatureError:
+            raise TokenExpired
+
+        except jwt.JWTClaimsError:
+            raise AuthHeaderInvalid(description='Incorrect claims. Please, check the audience and issuer.')
+        except Exception:
+            raise AuthHeaderInvalid(description='Unable to parse authentication token.')
+
+    def requires_auth(self, permission='', all_of=(), any_of=(), pass_payload=False):
+        """
+        Requires a valid token granting `permission` and every permission in `all_of`,
+        plus at least one of `any_of` if given. With `pass_payload`, the verified payload
+        is passed to the view as its first argument.
+        """
+        requirement = PermissionRequirement.compile(permission, all_of=all_of, any_of=any_of)
+
+        def requires_auth_decorator(f):
+            register_route(f.__name__, requirement)
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                token = get_token_auth_header()
+                payload = self.verify(token)
+                check_permissions(requirement, payload)
+                if pass_payload:
+                    return f(payload, *args, **kwargs)
+                return f(*args, **kwargs)
+
+            return wrapper
+
+        return requires_auth_decorator
@@ -0,0 +1,7 @@
+"""
+Database engine setup shared by the Flask apps in this repository
+
+configure_db() binds Flask-SQLAlchemy with a connection pool sized by the DB_* settings, so every worker process
+holds a bounded number of healthy connections, and only creates tables when asked.
+"""
+from .engine import DEFAULTS, engine_options, configure_db, pool_status
@@ -0,0 +1,113 @@
+import os
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool
+
+# Setting -> default. Each setting is read from the Flask config, then from an environment variable of the same name.
+DEFAULTS = {
+    # Connections each worker process keeps open, and how many more it may open under load
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    # Seconds a request waits for a free connection before failing
+    'DB_POOL_TIMEOUT': 30,
+    # Seconds after which a connection is replaced, below the server's (or load balancer's) idle timeout
+    'DB_POOL_RECYCLE': 1800,
+    # Test connections with a cheap round trip when they are checked out, so a restarted database does not fail a request
+    'DB_POOL_PRE_PING': True,
+    # Milliseconds a statement may run before Postgres cancels it. 0 leaves the server's setting.
+    'DB_STATEMENT_TIMEOUT': 0,
+    # Connections go through PgBouncer in transaction pooling mode, which does the pooling
+    'DB_PGBOUNCER': False,
+    # Create missing tables on startup. Schemas are otherwise managed with migrations or SQL dumps.
+    'DB_CREATE_ALL': False
+}
+
+
+def get_setting(config, name):
+    """
+    Returns a setting from the config, else from the environment, converted to the type of its default
+    """
+    default = DEFAULTS[name]
+    if name in config:
+        value = config[name]
+    elif name in os.environ:
+        value = os.environ[name]
+    else:
+        return default
+
+    if isinstance(value, str):
+        if isinstance(default, bool):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return type(default)(value)
+    return value
+
+
+def engine_options(database_uri, config=None):
+    """
+    Returns the SQLALCHEMY_ENGINE_OPTIONS for a database, built from the DB_* settings
+
+    Pool settings only apply to Postgres. In PgBouncer mode, connections are not pooled by the app and no startup
+    options are sent, since PgBouncer rejects them; set the statement timeout on the database role instead, e.g.
+    ALTER ROLE app SET statement_timeout = '30s'.
+    """
+    config = config if config is not None else {}
+    if make_url(database_uri).get_backend_name() not in ('postgres', 'postgresql'):
+        return {}
+
+    if get_setting(config, 'DB_PGBOUNCER'):
+        return {'poolclass': NullPool}
+
+    options = {
+        'pool_size': get_setting(config, 'DB_POOL_SIZE'),
+        'max_overflow': get_setting(config, 'DB_MAX_OVERFLOW'),
+        'pool_timeout': get_setting(config, 'DB_POOL_TIMEOUT'),
+        'pool_recycle': get_setting(config, 'DB_POOL_RECYCLE'),
+        'pool_pre_ping': get_setting(config, 'DB_POOL_PRE_PING')
+    }
+
+    statement_timeout = get_setting(config, 'DB_STATEMENT_TIMEOUT')
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+
+    return options
+
+
+def configure_db(app, db, database_uri=None, create_tables=None):
+    """
+    Binds a flask application and a SQLAlchemy service, with the engine options from the DB_* settings
+
+    Tables are only created when asked, with create_tables or the DB_CREATE_ALL setting.
+    EXAMPLE
+        configure_db(app, db, os.environ['DATABASE_URL'])
+    """
+    if database_uri:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    db.app = app
+    db.init_app(app)
+
+    if create_tables is None:
+        create_tables = get_setting(app.config, 'DB_CREATE_ALL')
+    if create_tables:
+        db.create_all()
+
+
+def pool_status(db):
+    """
+    Returns how many connections of this process are open and in use, e.g. for a health check
+    """
+    pool = db.engine.pool
+    if isinstance(pool, NullPool):
+        return {'pooled': False}
+
+    return {
+        'pooled': True,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'idle': pool.checkedin()
+    }
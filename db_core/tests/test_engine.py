@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
+from sqlalchemy.pool import NullPool
+
+from db_core.engine import engine_options, configure_db, pool_status
+
+POSTGRES = 'postgresql://localhost/fsnd'
+
+
+class EngineOptionsTestCase(unittest.TestCase):
+    """This class represents the engine options test case"""
+
+    def test_defaults(self):
+        options = engine_options(POSTGRES)
+
+        self.assertEqual(options['pool_size'], 5)
+        self.assertEqual(options['max_overflow'], 10)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertNotIn('connect_args', options)
+
+    def test_options_suit_any_sqlalchemy_version(self):
+        # executemany_mode needs SQLAlchemy 1.3.7, the apps pin older versions and set it themselves
+        self.assertNotIn('executemany_mode', engine_options(POSTGRES))
+
+    def test_config_then_environment(self):
+        with mock.patch.dict(os.environ, {'DB_POOL_SIZE': '2', 'DB_MAX_OVERFLOW': '0', 'DB_POOL_PRE_PING': 'false'}):
+            options = engine_options(POSTGRES, {'DB_POOL_SIZE': 20})
+
+        self.assertEqual(options['pool_size'], 20)
+        self.assertEqual(options['max_overflow'], 0)
+        self.assertFalse(options['pool_pre_ping'])
+
+    def test_statement_timeout(self):
+        options = engine_options('postgres://localhost/fsnd', {'DB_STATEMENT_TIMEOUT': 5000})
+
+        self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=5000'})
+
+    def test_pgbouncer(self):
+        options = engine_options(POSTGRES, {'DB_PGBOUNCER': True, 'DB_STATEMENT_TIMEOUT': 5000})
+
+        self.assertEqual(options, {'poolclass': NullPool})
+
+    def test_no_pool_options_for_sqlite(self):
+        self.assertEqual(engine_options('sqlite://'), {})
+
+
+class ConfigureDbTestCase(unittest.TestCase):
+    """This class represents the configure_db test case"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_uri = 'sqlite:///' + os.path.join(self.directory.name, 'test.db')
+        self.app = Flask(__name__)
+        self.db = SQLAlchemy()
+
+        class Item(self.db.Model):
+            id = self.db.Column(self.db.Integer, primary_key=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def table_names(self):
+        with self.app.app_context():
+            return inspect(self.db.engine).get_table_names()
+
+    def test_tables_are_not_created_by_default(self):
+        configure_db(self.app, self.db, self.database_uri)
+
+        self.assertEqual(self.table_names(), [])
+        self.assertFalse(self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'])
+
+    def test_tables_are_created_when_asked(self):
+        self.app.config['DB_CREATE_ALL'] = True
+        configure_db(self.app, self.db, self.database_uri)
+
+        self.assertEqual(self.table_names(), ['item'])
+
+    def test_pool_status(self):
+        configure_db(self.app, self.db, self.database_uri)
+
+        with self.app.app_context():
+            self.assertIn('pooled', pool_status(self.db))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -2,16 +2,29 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import functools
 import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import click
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort, Markup
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.associationproxy import association_proxy
+from db_core import configure_db
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
+from suggest import SuggestIndex
+from fragment_cache import FragmentCache
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
@@ -19,9 +32,9 @@ from forms import *
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
-
-# TODO: connect to a local postgresql database
+db = SQLAlchemy()
+configure_db(app, db)
+migrate = Migrate(app, db)
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -29,45 +42,674 @@ db = SQLAlchemy(app)
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    # Trigram index for case-insensitive substring search on names (pg_trgm). Listings and searches only read venues
+    # that are not deleted, so the indexes leave deleted venues out.
+    __table_args__ = (
+        db.Index(
+            'ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_where=db.text('deleted_at IS NULL')
+        ),
+        db.Index('ix_Venue_city', 'city', postgresql_where=db.text('deleted_at IS NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(500))
+    # Bumped along with any change to the venue or its shows, see bump_versions()
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Set when the venue is deleted, the venue and its shows are then purged in the background
+    deleted_at = db.Column(db.DateTime(timezone=True))
+
+    shows = db.relationship('Show', back_populates='venue', order_by='Show.start_time')
+    genre_rows = db.relationship('VenueGenre', cascade='all, delete-orphan', order_by='VenueGenre.genre')
+    # The genre names, e.g. venue.genres = ['Jazz', 'Swing']
+    genres = association_proxy('genre_rows', 'genre', creator=lambda genre: VenueGenre(genre=genre))
 
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+    @classmethod
+    def live(cls):
+        """
+        Filter on venues that are not deleted, e.g. Venue.query.filter(Venue.live())
+        """
+        return cls.deleted_at.is_(None)
+
+    @classmethod
+    def with_genre(cls, genre):
+        """
+        Filter on venues of a genre, e.g. Venue.query.filter(Venue.with_genre('Jazz')), a range of the VenueGenre key
+        """
+        return cls.id.in_(db.session.query(VenueGenre.venue_id).filter(VenueGenre.genre == genre))
+
+    @classmethod
+    def upcoming_show_counts(cls):
+        """
+        Query of (id, name, city, state, num_upcoming_shows) for every venue, ordered by area, in a single statement.
+        The counts are read from the show counters, up to date as of the last age_show_counts().
+        """
+        return db.session.query(
+            cls.id, cls.name, cls.city, cls.state,
+            db.func.coalesce(VenueShowCount.upcoming_shows_count, 0).label('num_upcoming_shows')
+        ).outerjoin(VenueShowCount).filter(cls.live()).order_by(cls.state, cls.city, cls.name)
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_city', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(500))
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    shows = db.relationship('Show', back_populates='artist', order_by='Show.start_time')
+    genre_rows = db.relationship('ArtistGenre', cascade='all, delete-orphan', order_by='ArtistGenre.genre')
+    genres = association_proxy('genre_rows', 'genre', creator=lambda genre: ArtistGenre(genre=genre))
+
+    @classmethod
+    def live(cls):
+        # Artists are not soft deleted, this lets queries over venues or artists filter either
+        return db.true()
+
+    @classmethod
+    def with_genre(cls, genre):
+        return cls.id.in_(db.session.query(ArtistGenre.artist_id).filter(ArtistGenre.genre == genre))
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+    # A venue's or an artist's past or upcoming shows are a range scan of one of these indexes, already in order
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        # Shows starting in a time window, e.g. the ones aging into the past
+        db.Index('ix_Show_start_time', 'start_time'),
+        db.CheckConstraint('end_time > start_time', name='ck_Show_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    start_time = db.Column(db.DateTime(timezone=True), nullable=False)
+    end_time = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    artist = db.relationship('Artist', back_populates='shows')
+    venue = db.relationship('Venue', back_populates='shows')
+
+    @classmethod
+    def upcoming(cls, now=None):
+        """
+        Filter on shows starting after now, e.g. Show.query.filter(Show.venue_id == venue_id, Show.upcoming())
+        """
+        return cls.start_time > (now or datetime.now(timezone.utc))
+
+    @classmethod
+    def past(cls, now=None):
+        return cls.start_time <= (now or datetime.now(timezone.utc))
+
+    @classmethod
+    def overlapping(cls, start, end):
+        """
+        Filter on shows taking place at some point of [start, end), e.g.
+        Show.query.filter(Show.venue_id == venue_id, Show.overlapping(start, end))
+
+        On Postgres, together with a venue or an artist, it is answered by the GiST index of the exclusion constraints.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            return db.func.tstzrange(cls.start_time, cls.end_time).op('&&')(db.func.tstzrange(start, end))
+        return db.and_(cls.start_time < end, cls.end_time > start)
+
+# A venue or an artist cannot have two shows at the same time. Postgres enforces it with exclusion constraints over
+# the period of shows, which need the btree_gist extension for the equality on venue_id and artist_id. The migrations
+# create it, and so does db.create_all().
+db.event.listen(Show.__table__, 'before_create', db.DDL(
+    'CREATE EXTENSION IF NOT EXISTS btree_gist'
+).execute_if(dialect='postgresql'))
+
+def period_exclusion(owner):
+    """
+    The DDL of the exclusion constraint refusing overlapping shows of a same 'venue' or 'artist'
+    """
+    return db.DDL(
+        f'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{owner}_period" '
+        f'EXCLUDE USING gist ({owner}_id WITH =, tstzrange(start_time, end_time) WITH &&)'
+    ).execute_if(dialect='postgresql')
+
+db.event.listen(Show.__table__, 'after_create', period_exclusion('venue'))
+db.event.listen(Show.__table__, 'after_create', period_exclusion('artist'))
+
+# SQLSTATE of a violated exclusion constraint, i.e. a double booking
+EXCLUSION_VIOLATION = '23P01'
+
+class ShowCount:
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+
+class VenueShowCount(ShowCount, db.Model):
+    __tablename__ = 'VenueShowCount'
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True)
+
+class ArtistShowCount(ShowCount, db.Model):
+    __tablename__ = 'ArtistShowCount'
+
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True)
+
+class Genre:
+    genre = db.Column(db.String(50), nullable=False)
+
+class VenueGenre(Genre, db.Model):
+    """
+    A genre of a venue. The key starts with the genre, so the venues of a genre are read from it.
+    """
+    __tablename__ = 'VenueGenre'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('genre', 'venue_id'),
+        db.Index('ix_VenueGenre_venue_id', 'venue_id'),
+    )
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+
+class ArtistGenre(Genre, db.Model):
+    __tablename__ = 'ArtistGenre'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('genre', 'artist_id'),
+        db.Index('ix_ArtistGenre_artist_id', 'artist_id'),
+    )
+
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+
+class VenuePurge(db.Model):
+    """
+    The purge of a deleted venue: its shows are deleted in batches, then the venue itself
+    """
+    __tablename__ = 'VenuePurge'
+
+    # Not a foreign key, the purge is kept once the venue is gone
+    venue_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    requested_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    finished_at = db.Column(db.DateTime(timezone=True))
+    shows_purged = db.Column(db.Integer, nullable=False, default=0)
+
+class ShowCountWatermark(db.Model):
+    """
+    A single row, with the time up to which started shows are counted as past
+    """
+    __tablename__ = 'ShowCountWatermark'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aged_until = db.Column(db.DateTime(timezone=True), nullable=False)
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Listings read each venue's and artist's upcoming and past show counts from these counters rather than counting
+# shows. A new show is added to them by count_new_show(), and age_show_counts() moves the shows that started since
+# its last run from upcoming to past.
+
+# Counter -> (its owner column, the matching column of shows)
+SHOW_COUNTERS = {
+    VenueShowCount: (VenueShowCount.venue_id, Show.venue_id),
+    ArtistShowCount: (ArtistShowCount.artist_id, Show.artist_id),
+}
+
+next_show_count_aging = 0
+
+def as_utc(value):
+  # SQLite returns naive datetimes
+  return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def count_new_show(show):
+  """
+  Adds a show, flushed in the current transaction, to the counters of its venue and artist
+  """
+  count_new_shows([{"venue_id": show.venue_id, "artist_id": show.artist_id, "start_time": show.start_time}])
+
+def count_new_shows(shows, removed=False):
+  """
+  Adds shows written in the current transaction, as dicts of venue_id, artist_id and start_time, to the counters of
+  their venues and artists, with a few statements for any number of shows. With removed, subtracts deleted shows.
+  """
+  # Aging waits for this transaction, so the shows cannot start before a newer watermark and be missed
+  watermark = ShowCountWatermark.query.with_for_update(read=True).get(1)
+  aged_until = as_utc(watermark.aged_until) if watermark is not None else None
+
+  for counter, (owner, show_owner) in SHOW_COUNTERS.items():
+    # Owner id -> its new upcoming and past shows
+    counts = {}
+    for show in shows:
+      past = aged_until is not None and as_utc(show['start_time']) <= aged_until
+      counts.setdefault(show[show_owner.key], [0, 0])[past] += -1 if removed else 1
+    if not counts:
+      continue
+
+    add_counts = counter.__table__.update().where(owner == db.bindparam('owner_id')).values(
+      upcoming_shows_count=counter.upcoming_shows_count + db.bindparam('upcoming'),
+      past_shows_count=counter.past_shows_count + db.bindparam('past')
+    )
+    if removed:
+      # Deleted shows were counted, and owners without a counter have nothing to subtract
+      db.session.execute(add_counts, [{
+        "owner_id": owner_id,
+        "upcoming": upcoming,
+        "past": past
+      } for owner_id, (upcoming, past) in counts.items()])
+      continue
+
+    counters = [{
+      owner.key: owner_id,
+      "upcoming_shows_count": upcoming,
+      "past_shows_count": past
+    } for owner_id, (upcoming, past) in counts.items()]
+    if db.engine.dialect.name == 'postgresql':
+      # Two transactions adding the first show of an owner both insert its counter, so the second one adds to it
+      statement = pg_insert(counter.__table__)
+      db.session.execute(statement.on_conflict_do_update(index_elements=[owner], set_={
+        'upcoming_shows_count': counter.upcoming_shows_count + statement.excluded.upcoming_shows_count,
+        'past_shows_count': counter.past_shows_count + statement.excluded.past_shows_count
+      }), counters)
+      continue
+
+    # Other databases, e.g. SQLite for local tests, are not written concurrently
+    counted = {owner_id for owner_id, in db.session.query(owner).filter(
+      owner.in_(db.bindparam('owner_ids', expanding=True))
+    ).params(owner_ids=list(counts))}
+    new_counters = [values for values in counters if values[owner.key] not in counted]
+    if new_counters:
+      db.session.execute(counter.__table__.insert(), new_counters)
+    if counted:
+      db.session.execute(add_counts, [{
+        "owner_id": owner_id,
+        "upcoming": counts[owner_id][0],
+        "past": counts[owner_id][1]
+      } for owner_id in counted])
+
+def age_show_counts(now=None):
+  """
+  Moves the shows that started since the last run from the upcoming to the past counters, and commits
+  """
+  now = now or datetime.now(timezone.utc)
+  watermark = ShowCountWatermark.query.with_for_update().get(1)
+  if watermark is None:
+    db.session.rollback()
+    return rebuild_show_counts(now)
+
+  if now > as_utc(watermark.aged_until):
+    started = db.and_(Show.start_time > watermark.aged_until, Show.start_time <= now)
+    for counter, (owner, show_owner) in SHOW_COUNTERS.items():
+      started_shows = db.select([db.func.count(Show.id)]).where(db.and_(show_owner == owner, started)).as_scalar()
+      counter.query.filter(owner.in_(db.select([show_owner]).where(started))).update({
+        counter.upcoming_shows_count: counter.upcoming_shows_count - started_shows,
+        counter.past_shows_count: counter.past_shows_count + started_shows
+      }, synchronize_session=False)
+    watermark.aged_until = now
+
+  db.session.commit()
+
+def rebuild_show_counts(now=None):
+  """
+  Counts the shows of every venue and artist again, and commits
+  """
+  now = now or datetime.now(timezone.utc)
+  watermark = ShowCountWatermark.query.with_for_update().get(1)
+  if watermark is None:
+    watermark = ShowCountWatermark(id=1, aged_until=now)
+    db.session.add(watermark)
+
+  for counter, (owner, show_owner) in SHOW_COUNTERS.items():
+    counter.query.delete(synchronize_session=False)
+    db.session.execute(counter.__table__.insert().from_select(
+      [owner.key, 'upcoming_shows_count', 'past_shows_count'],
+      db.select([
+        show_owner,
+        db.func.count(Show.id).filter(Show.upcoming(now)),
+        db.func.count(Show.id).filter(Show.past(now))
+      ]).group_by(show_owner)
+    ))
+  watermark.aged_until = now
+
+  db.session.commit()
+
+def age_show_counts_if_due():
+  """
+  Ages the show counters at most every SHOW_COUNTS_AGING_INTERVAL seconds, from listing pages
+  """
+  global next_show_count_aging
+  if time.monotonic() < next_show_count_aging:
+    return
+  next_show_count_aging = time.monotonic() + app.config.get('SHOW_COUNTS_AGING_INTERVAL', 60)
+  age_show_counts()
+
+@app.cli.command('show-counts')
+@click.option('--rebuild', is_flag=True, help='Count every show again instead of aging the counters')
+def update_show_counts(rebuild):
+  """
+  Ages the show counters, e.g. from cron, or rebuilds them
+  """
+  rebuild_show_counts() if rebuild else age_show_counts()
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+def escape_like(term):
+  return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_query(model, counter, term, limit=None):
+  """
+  Query of the venues or artists whose name contains term, case-insensitively, with their upcoming show count and
+  the count of every match. The most similar names come first and at most SEARCH_RESULTS_MAX are returned.
+
+  On Postgres, the ILIKE is answered by the trigram index on the name and results are ranked by trigram similarity.
+  Other databases (e.g. SQLite for local tests) scan the names and rank by where the term appears.
+  """
+  limit = limit or app.config.get('SEARCH_RESULTS_MAX', 20)
+  if db.engine.dialect.name == 'postgresql':
+    relevance = db.func.similarity(model.name, term).desc()
+  else:
+    relevance = db.func.instr(db.func.lower(model.name), term.lower())
+
+  return db.session.query(
+    model.id, model.name,
+    db.func.coalesce(counter.upcoming_shows_count, 0).label('num_upcoming_shows'),
+    db.func.count().over().label('matches')
+  ).outerjoin(counter).filter(
+    model.live(), model.name.ilike(f'%{escape_like(term)}%', escape='\\')
+  ).order_by(relevance, db.func.length(model.name), model.id).limit(limit)
+
+def search_by_name(model, counter, term):
+  """
+  Returns the search results in the structure of the search pages
+  """
+  rows = search_query(model, counter, term).all()
+  return {
+    "count": rows[0].matches if rows else 0,
+    "data": [{
+      "id": row.id,
+      "name": row.name,
+      "num_upcoming_shows": row.num_upcoming_shows,
+    } for row in rows]
+  }
+
+#----------------------------------------------------------------------------#
+# Suggestions.
+#----------------------------------------------------------------------------#
+
+def load_suggestions():
+  with app.app_context():
+    try:
+      return tuple(
+        db.session.query(model.id, model.name, model.city, model.state).filter(model.live()).all()
+        for model in (Venue, Artist)
+      )
+    finally:
+      db.session.remove()
+
+# Venue, artist and city names for the typeahead, loaded after the first request and every SUGGEST_INDEX_TTL seconds
+suggest_index = SuggestIndex(load_suggestions, ttl=app.config.get('SUGGEST_INDEX_TTL', 300))
+
+def suggest_from_db(query, limit):
+  """
+  Suggestions while the index is not loaded yet: venues, artists and cities with a word starting with the query
+  """
+  term = escape_like(query.strip())
+  suggestions = []
+  for kind, model in (('venue', Venue), ('artist', Artist)):
+    for row in db.session.query(model.id, model.name, model.city, model.state).filter(model.live(), db.or_(
+      model.name.ilike(f'{term}%', escape='\\'), model.name.ilike(f'% {term}%', escape='\\')
+    )).order_by(db.func.length(model.name), model.name).limit(limit):
+      suggestions.append({"type": kind, "id": row.id, "name": row.name, "city": row.city, "state": row.state})
+
+  areas = db.union(*(
+    db.select([model.city, model.state]).where(db.and_(model.live(), model.city.ilike(f'{term}%', escape='\\')))
+    for model in (Venue, Artist)
+  )).limit(limit)
+  for city, state in db.session.execute(areas):
+    suggestions.append({"type": "area", "name": f'{city}, {state}', "city": city, "state": state})
+
+  return sorted(suggestions, key=lambda suggestion: len(suggestion['name']))[:limit]
+
+@db.event.listens_for(Venue, 'after_insert')
+@db.event.listens_for(Venue, 'after_update')
+@db.event.listens_for(Artist, 'after_insert')
+@db.event.listens_for(Artist, 'after_update')
+def track_suggestion(mapper, connection, target):
+  # Applied to the index once the transaction commits
+  changes = db.session.info.setdefault('suggestion_changes', {})
+  kind = 'venue' if isinstance(target, Venue) else 'artist'
+  if getattr(target, 'deleted_at', None) is not None:
+    changes[(kind, target.id)] = None
+  else:
+    changes[(kind, target.id)] = (target.name, target.city, target.state)
+
+@db.event.listens_for(Venue, 'after_delete')
+@db.event.listens_for(Artist, 'after_delete')
+def track_deleted_suggestion(mapper, connection, target):
+  changes = db.session.info.setdefault('suggestion_changes', {})
+  changes[('venue' if isinstance(target, Venue) else 'artist', target.id)] = None
+
+@db.event.listens_for(db.session, 'after_commit')
+def update_suggestions(session):
+  for (kind, key), change in session.info.pop('suggestion_changes', {}).items():
+    if change is None:
+      suggest_index.remove(kind, key)
+    else:
+      suggest_index.put(kind, key, *change)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def forget_suggestions(session):
+  session.info.pop('suggestion_changes', None)
 
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#----------------------------------------------------------------------------#
+
+# Rendered venue and artist page bodies and show tiles, keyed by the ids and versions of the venues and artists they
+# show. Views changing a venue, an artist or their shows bump the versions of every venue and artist whose fragments
+# show the change, in the same transaction.
+fragment_cache = FragmentCache(app.config.get('FRAGMENT_CACHE_SIZE', 1024))
+
+def bump_versions(model, criterion):
+  """
+  Bumps the version of the venues or artists matching criterion, in the current transaction, so that their fragments
+  are rendered again, e.g. bump_versions(Venue, Venue.id == venue_id)
+  """
+  model.query.filter(criterion).update({model.version: model.version + 1}, synchronize_session=False)
+
+def cached(*key, caller):
+  """
+  Renders the body of a call block once per key, e.g.
+  {% call cached('show', show.id, show.venue_version, show.artist_version) %}...{% endcall %}
+  """
+  return fragment_cache.render(key, caller)
+
+app.jinja_env.globals['cached'] = cached
+
+def next_show_start(upcoming_shows):
+  """
+  The timestamp when the first of upcoming shows starts, when a page listing them as upcoming is outdated
+  """
+  if upcoming_shows:
+    return as_utc(upcoming_shows[0]['start_time']).timestamp()
+  return None
+
+#----------------------------------------------------------------------------#
+# Venue purges.
+#----------------------------------------------------------------------------#
+
+# Deleting a venue only marks it deleted, which hides it from listings, searches and suggestions right away. Its shows
+# are then deleted in batches of VENUE_PURGE_BATCH_SIZE, each in a short transaction of its own, so that a venue with
+# years of shows never holds long locks. A background thread of the process that deleted the venue runs the purges,
+# and `flask purge-venues` does too, e.g. from cron to finish the purges of a restarted process.
+
+purge_lock = threading.Lock()
+# Whether a purge thread is running, and whether a venue was deleted since it last looked for pending purges
+purging = False
+purge_requested = False
+
+def purge_batch(size):
+  """
+  Deletes a batch of shows of a deleted venue, taking them off the counters of their artists, or the venue itself once
+  its shows are gone, and commits. Returns False when no purge is left to do.
+  """
+  # Skips the purges another process has a batch of under way
+  purge = VenuePurge.query.filter(VenuePurge.finished_at.is_(None)).order_by(
+    VenuePurge.requested_at
+  ).with_for_update(skip_locked=True).first()
+  if purge is None:
+    db.session.rollback()
+    return False
+
+  shows = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time).filter(
+    Show.venue_id == purge.venue_id
+  ).order_by(Show.start_time).limit(size).all()
+  if shows:
+    count_new_shows([show._asdict() for show in shows], removed=True)
+    Show.query.filter(Show.id.in_(db.bindparam('ids', [show.id for show in shows], expanding=True))).delete(
+      synchronize_session=False
+    )
+    purge.shows_purged += len(shows)
+  else:
+    VenueShowCount.query.filter(VenueShowCount.venue_id == purge.venue_id).delete(synchronize_session=False)
+    venue = Venue.query.get(purge.venue_id)
+    if venue is not None:
+      db.session.delete(venue)
+    purge.finished_at = datetime.now(timezone.utc)
+  db.session.commit()
+  return True
+
+def purge_venues():
+  """
+  Runs the pending purges to the end, pausing VENUE_PURGE_PAUSE seconds between batches to let other writes through
+  """
+  while purge_batch(app.config.get('VENUE_PURGE_BATCH_SIZE', 1000)):
+    time.sleep(app.config.get('VENUE_PURGE_PAUSE', 0.1))
+
+def run_purges():
+  global purging, purge_requested
+  with app.app_context():
+    while True:
+      with purge_lock:
+        if not purge_requested:
+          purging = False
+          return
+        purge_requested = False
+      try:
+        purge_venues()
+      except Exception:
+        # The purge stays pending, for the next deletion or `flask purge-venues`
+        app.logger.exception('Venue purge failed')
+      finally:
+        db.session.remove()
+
+def purge_in_background():
+  """
+  Runs the pending purges in a thread, started unless this process has one running already
+  """
+  global purging, purge_requested
+  with purge_lock:
+    purge_requested = True
+    if purging:
+      return
+    purging = True
+  threading.Thread(target=run_purges, daemon=True).start()
+
+@app.cli.command('purge-venues')
+def purge_deleted_venues():
+  """
+  Purges the shows of deleted venues, e.g. from cron
+  """
+  purge_venues()
+
+#----------------------------------------------------------------------------#
+# Bulk loading.
+#----------------------------------------------------------------------------#
 
-# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+@app.cli.command('load')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), help='By default, from the file name')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows written per transaction')
+def load_rows(kind, path, file_format, chunk_size):
+  """
+  Loads venues, artists or shows from a CSV or NDJSON file, e.g. flask load venues venues.csv
+  """
+  # bulk_load uses the models of this module
+  from bulk_load import load_file, LoadError
+  try:
+    result = load_file(kind, path, file_format, chunk_size)
+  except LoadError as error:
+    raise click.ClickException(f'{error}\nThe rows before line {error.first_line} are loaded.')
+  click.echo(f'{result["loaded"]} {kind} loaded, {result["skipped"]} skipped')
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+# Named formats of the datetime filter, other formats are babel patterns
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+@functools.lru_cache(maxsize=64)
+def datetime_pattern(format, locale):
+  """
+  The parsed babel pattern and locale of a format, resolved once per (format, locale). A format is one of
+  DATETIME_FORMATS, a babel format name ('short', 'medium', 'long' or 'full') of the locale, or a pattern.
+  """
+  locale = babel.Locale.parse(locale)
+  if format in DATETIME_FORMATS:
+    pattern = DATETIME_FORMATS[format]
+  elif format in locale.datetime_formats:
+    # As babel.dates.format_datetime() does, e.g. "{1}, {0}" with the date and time patterns of the format
+    pattern = locale.datetime_formats[format] \
+      .replace('{0}', locale.time_formats[format].pattern) \
+      .replace('{1}', locale.date_formats[format].pattern)
+  else:
+    pattern = format
+  return babel.dates.parse_pattern(pattern), locale
+
+def parse_datetime(value):
+  if isinstance(value, datetime):
+    return value
+  try:
+    # ISO 8601, e.g. the isoformat() of a show's start time, without the general parser
+    return datetime.fromisoformat(value)
+  except ValueError:
+    return dateutil.parser.parse(value)
+
+@functools.lru_cache(maxsize=app.config.get('DATETIME_FILTER_CACHE_SIZE', 4096))
+def formatted_datetime(value, tzinfo, format, locale):
+  # tzinfo is part of the key, equal datetimes in two time zones are written differently
+  date = parse_datetime(value)
+  if date.tzinfo is None:
+    # As babel does
+    date = date.replace(tzinfo=timezone.utc)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(date, locale)
+
+def format_datetime(value, format='medium', locale=None):
+  """
+  Formats a datetime, or a string of one, in the system time locale by default. The most recent results are
+  remembered, as pages render the same show times over and over.
+  """
+  return formatted_datetime(value, getattr(value, 'tzinfo', None), format, locale or babel.dates.LC_TIME)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
@@ -75,6 +717,10 @@ app.jinja_env.filters['datetime'] = format_datetime
 # Controllers.
 #----------------------------------------------------------------------------#
 
+@app.before_first_request
+def load_suggest_index():
+  suggest_index.refresh_in_background()
+
 @app.route('/')
 def index():
   return render_template('pages/home.html')
@@ -85,129 +731,163 @@ def index():
 
 @app.route('/venues')
 def venues():
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  data=[{
-    "city": "San Francisco",
-    "state": "CA",
-    "venues": [{
-      "id": 1,
-      "name": "The Musical Hop",
-      "num_upcoming_shows": 0,
-    }, {
-      "id": 3,
-      "name": "Park Square Live Music & Coffee",
-      "num_upcoming_shows": 1,
-    }]
-  }, {
-    "city": "New York",
-    "state": "NY",
-    "venues": [{
-      "id": 2,
-      "name": "The Dueling Pianos Bar",
-      "num_upcoming_shows": 0,
-    }]
-  }]
-  return render_template('pages/venues.html', areas=data);
+  age_show_counts_if_due()
+  # ?genre= and ?city= narrow the venues to a genre and a city
+  query = Venue.upcoming_show_counts()
+  if request.args.get('genre'):
+    query = query.filter(Venue.with_genre(request.args['genre']))
+  if request.args.get('city'):
+    query = query.filter(Venue.city == request.args['city'])
+
+  # Venues come ordered by area, so they are grouped in one pass
+  areas = []
+  for venue in query:
+    if not areas or (areas[-1]['city'], areas[-1]['state']) != (venue.city, venue.state):
+      areas.append({
+        "city": venue.city,
+        "state": venue.state,
+        "venues": []
+      })
+    areas[-1]['venues'].append({
+      "id": venue.id,
+      "name": venue.name,
+      "num_upcoming_shows": venue.num_upcoming_shows,
+    })
+  return render_template('pages/venues.html', areas=areas)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-  response={
-    "count": 1,
-    "data": [{
-      "id": 2,
-      "name": "The Dueling Pianos Bar",
-      "num_upcoming_shows": 0,
-    }]
-  }
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  age_show_counts_if_due()
+  search_term = request.form.get('search_term', '')
+  response = search_by_name(Venue, VenueShowCount, search_term)
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@app.route('/search/suggest')
+def search_suggest():
+  # Typeahead suggestions of venues, artists and cities, as JSON
+  query = request.args.get('q', '')
+  limit = max(1, min(request.args.get('limit', 10, type=int), app.config.get('SUGGEST_RESULTS_MAX', 20)))
+
+  source = 'index'
+  suggestions = suggest_index.search(query, limit)
+  if suggestions is None:
+    source = 'database'
+    suggestions = suggest_from_db(query, limit) if query.strip() else []
+
+  return jsonify({
+    "query": query,
+    "source": source,
+    "results": suggestions
+  })
+
+def shows_with(show_owner, owner_id, counterpart, upcoming, now=None):
+  """
+  Upcoming shows (soonest first) or past shows (latest first) of a venue or an artist, with the name and image link
+  of the artist or venue of each show, in one query. E.g. shows_with(Show.venue_id, 1, Artist, upcoming=True)
+  """
+  prefix = 'artist' if counterpart is Artist else 'venue'
+  counterpart_id = Show.artist_id if counterpart is Artist else Show.venue_id
+  query = db.session.query(
+    counterpart_id, counterpart.name, counterpart.image_link, Show.start_time
+  ).join(counterpart, counterpart.id == counterpart_id).filter(show_owner == owner_id, counterpart.live())
+
+  # A range scan of the (owner, start_time) index, already in order
+  if upcoming:
+    query = query.filter(Show.upcoming(now)).order_by(Show.start_time)
+  else:
+    query = query.filter(Show.past(now)).order_by(Show.start_time.desc())
+
+  return [{
+    f"{prefix}_id": show_id,
+    f"{prefix}_name": name,
+    f"{prefix}_image_link": image_link,
+    "start_time": start_time
+  } for show_id, name, image_link, start_time in query]
+
+def live_venue_or_404(venue_id, *options):
+  # Deleted venues are not found, while they are purged too
+  venue = Venue.query.options(*options).get_or_404(venue_id)
+  if venue.deleted_at is not None:
+    abort(404)
+  return venue
 
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data1={
-    "id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-    "past_shows": [{
-      "artist_id": 4,
-      "artist_name": "Guns N Petals",
-      "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-      "start_time": "2019-05-21T21:30:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data2={
-    "id": 2,
-    "name": "The Dueling Pianos Bar",
-    "genres": ["Classical", "R&B", "Hip-Hop"],
-    "address": "335 Delancey Street",
-    "city": "New York",
-    "state": "NY",
-    "phone": "914-003-1132",
-    "website": "https://www.theduelingpianos.com",
-    "facebook_link": "https://www.facebook.com/theduelingpianos",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-    "past_shows": [],
-    "upcoming_shows": [],
-    "past_shows_count": 0,
-    "upcoming_shows_count": 0,
-  }
-  data3={
-    "id": 3,
-    "name": "Park Square Live Music & Coffee",
-    "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-    "address": "34 Whiskey Moore Ave",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "415-000-1234",
-    "website": "https://www.parksquarelivemusicandcoffee.com",
-    "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-    "past_shows": [{
-      "artist_id": 5,
-      "artist_name": "Matt Quevedo",
-      "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-      "start_time": "2019-06-15T23:00:00.000Z"
-    }],
-    "upcoming_shows": [{
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-01T20:00:00.000Z"
-    }, {
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-08T20:00:00.000Z"
-    }, {
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-15T20:00:00.000Z"
-    }],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 1,
+  # The page body is rendered again when the venue's version changes or its next upcoming show starts
+  venue = live_venue_or_404(venue_id, db.joinedload(Venue.genre_rows))
+  key = ('venue', venue.id, venue.version)
+  content = fragment_cache.get(key)
+  if content is not None:
+    return render_template('pages/show_venue.html', content=content)
+
+  now = datetime.now(timezone.utc)
+  upcoming_shows = shows_with(Show.venue_id, venue_id, Artist, upcoming=True, now=now)
+  past_shows = shows_with(Show.venue_id, venue_id, Artist, upcoming=False, now=now)
+
+  data = {
+    "id": venue.id,
+    "name": venue.name,
+    "genres": list(venue.genres),
+    "address": venue.address,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website": venue.website,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link": venue.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
   }
-  data = list(filter(lambda d: d['id'] == venue_id, [data1, data2, data3]))[0]
-  return render_template('pages/show_venue.html', venue=data)
+  content = Markup(render_template('pages/show_venue_content.html', venue=data))
+  fragment_cache.put(key, content, next_show_start(upcoming_shows))
+  return render_template('pages/show_venue.html', content=content)
+
+def free_slots(venue_id, start, end, min_minutes=0):
+  """
+  Returns the periods of [start, end) when a venue has no show, of at least min_minutes, as (start, end) pairs.
+  Only the shows overlapping [start, end) are read, through the venue's interval index on Postgres.
+  """
+  booked = db.session.query(Show.start_time, Show.end_time).filter(
+    Show.venue_id == venue_id, Show.overlapping(start, end)
+  ).order_by(Show.start_time)
+
+  slots = []
+  free_from = start
+  for show_start, show_end in booked:
+    show_start, show_end = as_utc(show_start), as_utc(show_end)
+    if show_start > free_from:
+      slots.append((free_from, show_start))
+    free_from = max(free_from, show_end)
+  if free_from < end:
+    slots.append((free_from, end))
+  return [(slot_start, slot_end) for slot_start, slot_end in slots
+          if slot_end - slot_start >= timedelta(minutes=min_minutes)]
+
+@app.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+  # free slots of a venue, from ?from= (now by default) to ?to= (a week later by default)
+  # ?minutes= leaves out the slots shorter than a show of that length
+  venue = live_venue_or_404(venue_id)
+  start = parse_time(request.args['from']) if request.args.get('from') else datetime.now(timezone.utc)
+  end = parse_time(request.args['to'], end_of_day=True) if request.args.get('to') else start + timedelta(days=7)
+  min_minutes = request.args.get('minutes', 0, type=int)
+  if end <= start or end - start > timedelta(days=app.config.get('AVAILABILITY_DAYS_MAX', 31)):
+    abort(400)
+
+  return jsonify({
+    "venue_id": venue.id,
+    "from": start.isoformat(),
+    "to": end.isoformat(),
+    "free": [{
+      "start": slot_start.isoformat(),
+      "end": slot_end.isoformat()
+    } for slot_start, slot_end in free_slots(venue.id, start, end, min_minutes)]
+  })
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -229,177 +909,177 @@ def create_venue_submission():
   # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
   return render_template('pages/home.html')
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
-  # TODO: Complete this endpoint for taking a venue_id, and using
-  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  # hides the venue right away, its shows and then the venue itself are purged in the background
+  # GET /venues/<venue_id>/purge tells how far the purge is
+  venue = live_venue_or_404(venue_id)
+  now = datetime.now(timezone.utc)
+  try:
+    venue.deleted_at = now
+    bump_versions(Venue, Venue.id == venue_id)
+    # The pages of the artists that played there list its shows
+    bump_versions(Artist, Artist.id.in_(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id)))
+    db.session.add(VenuePurge(venue_id=venue_id, requested_at=now))
+    db.session.commit()
+  except SQLAlchemyError:
+    db.session.rollback()
+    app.logger.exception('Venue could not be deleted')
+    return jsonify({"success": False}), 500
 
-  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-  # clicking that button delete it from the db then redirect the user to the homepage
-  return None
+  if app.config.get('VENUE_PURGE_IN_BACKGROUND', True):
+    purge_in_background()
+  return jsonify({
+    "success": True,
+    "id": venue_id,
+    "purge": url_for('venue_purge', venue_id=venue_id)
+  }), 202
+
+@app.route('/venues/<int:venue_id>/purge')
+def venue_purge(venue_id):
+  # status of the purge of a deleted venue
+  purge = VenuePurge.query.get_or_404(venue_id)
+  return jsonify({
+    "venue_id": purge.venue_id,
+    "status": "done" if purge.finished_at else "purging",
+    "requested_at": as_utc(purge.requested_at).isoformat(),
+    "finished_at": as_utc(purge.finished_at).isoformat() if purge.finished_at else None,
+    "shows_purged": purge.shows_purged
+  })
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
 def artists():
-  # TODO: replace with real data returned from querying the database
-  data=[{
-    "id": 4,
-    "name": "Guns N Petals",
-  }, {
-    "id": 5,
-    "name": "Matt Quevedo",
-  }, {
-    "id": 6,
-    "name": "The Wild Sax Band",
-  }]
+  # ?genre= and ?city= narrow the artists to a genre and a city, e.g. /artists?genre=Jazz&city=San Francisco
+  query = db.session.query(Artist.id, Artist.name).order_by(Artist.name)
+  if request.args.get('genre'):
+    query = query.filter(Artist.with_genre(request.args['genre']))
+  if request.args.get('city'):
+    query = query.filter(Artist.city == request.args['city'])
+
+  data = [{
+    "id": artist.id,
+    "name": artist.name,
+  } for artist in query]
   return render_template('pages/artists.html', artists=data)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-  # search for "band" should return "The Wild Sax Band".
-  response={
-    "count": 1,
-    "data": [{
-      "id": 4,
-      "name": "Guns N Petals",
-      "num_upcoming_shows": 0,
-    }]
-  }
-  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+  age_show_counts_if_due()
+  search_term = request.form.get('search_term', '')
+  response = search_by_name(Artist, ArtistShowCount, search_term)
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
-  # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data1={
-    "id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-    "past_shows": [{
-      "venue_id": 1,
-      "venue_name": "The Musical Hop",
-      "venue_image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-      "start_time": "2019-05-21T21:30:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data2={
-    "id": 5,
-    "name": "Matt Quevedo",
-    "genres": ["Jazz"],
-    "city": "New York",
-    "state": "NY",
-    "phone": "300-400-5000",
-    "facebook_link": "https://www.facebook.com/mattquevedo923251523",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    "past_shows": [{
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2019-06-15T23:00:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data3={
-    "id": 6,
-    "name": "The Wild Sax Band",
-    "genres": ["Jazz", "Classical"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "432-325-5432",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "past_shows": [],
-    "upcoming_shows": [{
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-01T20:00:00.000Z"
-    }, {
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-08T20:00:00.000Z"
-    }, {
-      "venue_id": 3,
-      "venue_name": "Park Square Live Music & Coffee",
-      "venue_image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-      "start_time": "2035-04-15T20:00:00.000Z"
-    }],
-    "past_shows_count": 0,
-    "upcoming_shows_count": 3,
+  # shows the artist page with the given artist_id
+  artist = Artist.query.options(db.joinedload(Artist.genre_rows)).get_or_404(artist_id)
+  key = ('artist', artist.id, artist.version)
+  content = fragment_cache.get(key)
+  if content is not None:
+    return render_template('pages/show_artist.html', artist_name=artist.name, content=content)
+
+  now = datetime.now(timezone.utc)
+  upcoming_shows = shows_with(Show.artist_id, artist_id, Venue, upcoming=True, now=now)
+  past_shows = shows_with(Show.artist_id, artist_id, Venue, upcoming=False, now=now)
+
+  data = {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": list(artist.genres),
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "website": artist.website,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link": artist.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
   }
-  data = list(filter(lambda d: d['id'] == artist_id, [data1, data2, data3]))[0]
-  return render_template('pages/show_artist.html', artist=data)
+  content = Markup(render_template('pages/show_artist_content.html', artist=data))
+  fragment_cache.put(key, content, next_show_start(upcoming_shows))
+  return render_template('pages/show_artist.html', artist_name=artist.name, content=content)
 
 #  Update
 #  ----------------------------------------------------------------
+# The columns set from the venue and artist forms, besides genres
+VENUE_FIELDS = ('name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link')
+ARTIST_FIELDS = ('name', 'city', 'state', 'phone', 'image_link', 'facebook_link')
+
+def update_from_form(owner, form, fields):
+  """
+  Sets the fields and genres of a venue or an artist from its form. Returns whether the name or image changed, which
+  the pages and tiles of its counterparts show too.
+  """
+  shown = (owner.name, owner.image_link)
+  for field in fields:
+    setattr(owner, field, form[field].data or None)
+
+  # Only the added and removed genres are written
+  genres = set(form.genres.data)
+  for row in [row for row in owner.genre_rows if row.genre not in genres]:
+    owner.genre_rows.remove(row)
+  for genre in sorted(genres - set(owner.genres)):
+    owner.genres.append(genre)
+  return (owner.name, owner.image_link) != shown
+
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
-  form = ArtistForm()
-  artist={
-    "id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80"
-  }
-  # TODO: populate form with fields from artist with ID <artist_id>
+  artist = Artist.query.get_or_404(artist_id)
+  form = ArtistForm(obj=artist)
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
-  # TODO: take values from the form submitted, and update existing
-  # artist record with ID <artist_id> using the new attributes
+  artist = Artist.query.get_or_404(artist_id)
+  form = ArtistForm(request.form)
+  if not form.validate():
+    flash('Please check the artist fields.')
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
 
+  try:
+    if update_from_form(artist, form, ARTIST_FIELDS):
+      # The pages of the venues it plays at show its name and image
+      bump_versions(Venue, Venue.id.in_(db.session.query(Show.venue_id).filter(Show.artist_id == artist_id)))
+    bump_versions(Artist, Artist.id == artist_id)
+    db.session.commit()
+    flash('Artist ' + form.name.data + ' was successfully updated!')
+  except SQLAlchemyError:
+    db.session.rollback()
+    app.logger.exception('Artist could not be updated')
+    flash('An error occurred. Artist ' + form.name.data + ' could not be updated.')
   return redirect(url_for('show_artist', artist_id=artist_id))
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
-  form = VenueForm()
-  venue={
-    "id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60"
-  }
-  # TODO: populate form with values from venue with ID <venue_id>
+  venue = live_venue_or_404(venue_id)
+  form = VenueForm(obj=venue)
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
-  # TODO: take values from the form submitted, and update existing
-  # venue record with ID <venue_id> using the new attributes
+  venue = live_venue_or_404(venue_id)
+  form = VenueForm(request.form)
+  if not form.validate():
+    flash('Please check the venue fields.')
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+  try:
+    if update_from_form(venue, form, VENUE_FIELDS):
+      # The pages of the artists playing there show its name and image
+      bump_versions(Artist, Artist.id.in_(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id)))
+    bump_versions(Venue, Venue.id == venue_id)
+    db.session.commit()
+    flash('Venue ' + form.name.data + ' was successfully updated!')
+  except SQLAlchemyError:
+    db.session.rollback()
+    app.logger.exception('Venue could not be updated')
+    flash('An error occurred. Venue ' + form.name.data + ' could not be updated.')
   return redirect(url_for('show_venue', venue_id=venue_id))
 
 #  Create Artist
@@ -426,48 +1106,110 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
+def parse_time(value, end_of_day=False):
+  """
+  A datetime in UTC from an ISO date or date and time, e.g. 2035-04-01 or 2035-04-01T20:00. With end_of_day, a date
+  alone stands for the end of that day, so that ?to=2035-04-01 includes the shows of April 1st.
+  """
+  try:
+    parsed = datetime.fromisoformat(value)
+  except ValueError:
+    abort(400)
+  if end_of_day and len(value) == len('2035-04-01'):
+    parsed += timedelta(days=1)
+  return as_utc(parsed)
+
+def shows_page(start=None, end=None, venue_id=None, artist_id=None, past=False, after=None, limit=30):
+  """
+  Shows starting in [start, end), with their venue and artist, ordered by (start_time, id), or latest first when past.
+  Returns up to limit shows and the (start_time, id) cursor of the next page, None on the last page.
+
+  Pages are read after the cursor of the previous page, so any page is a range scan of the start_time index (or of
+  the venue's or artist's shows), however many shows come before it.
+  """
+  query = db.session.query(
+    Show.id, Show.start_time, Show.venue_id, Venue.name, Show.artist_id, Artist.name, Artist.image_link,
+    Venue.version.label('venue_version'), Artist.version.label('artist_version')
+  ).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id).filter(Venue.live())
+
+  if start is not None:
+    query = query.filter(Show.start_time >= start)
+  if end is not None:
+    query = query.filter(Show.start_time < end)
+  if venue_id is not None:
+    query = query.filter(Show.venue_id == venue_id)
+  if artist_id is not None:
+    query = query.filter(Show.artist_id == artist_id)
+
+  if after is not None:
+    # (start_time, id) past the cursor, spelled out so that the start_time bound is an index condition
+    after_time, after_id = after
+    if past:
+      query = query.filter(Show.start_time <= after_time, db.or_(Show.start_time < after_time, Show.id < after_id))
+    else:
+      query = query.filter(Show.start_time >= after_time, db.or_(Show.start_time > after_time, Show.id > after_id))
+
+  if past:
+    query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  else:
+    query = query.order_by(Show.start_time, Show.id)
+
+  # One more row tells whether there is a next page
+  rows = query.limit(limit + 1).all()
+  shows = [{
+    "id": row.id,
+    "venue_id": row[2],
+    "venue_name": row[3],
+    "venue_version": row.venue_version,
+    "artist_id": row[4],
+    "artist_name": row[5],
+    "artist_image_link": row[6],
+    "artist_version": row.artist_version,
+    "start_time": row.start_time
+  } for row in rows[:limit]]
+
+  next_after = None
+  if len(rows) > limit:
+    next_after = (as_utc(rows[limit - 1].start_time), rows[limit - 1].id)
+  return shows, next_after
+
 @app.route('/shows')
 def shows():
   # displays list of shows at /shows
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  data=[{
-    "venue_id": 1,
-    "venue_name": "The Musical Hop",
-    "artist_id": 4,
-    "artist_name": "Guns N Petals",
-    "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-    "start_time": "2019-05-21T21:30:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 5,
-    "artist_name": "Matt Quevedo",
-    "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    "start_time": "2019-06-15T23:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-01T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-08T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-15T20:00:00.000Z"
-  }]
-  return render_template('pages/shows.html', shows=data)
+  # Upcoming shows by default, ?when=past for past shows (latest first) and ?when=all for every show.
+  # ?from= and ?to= narrow them to a time window, ?venue_id= and ?artist_id= to a venue or an artist.
+  when = request.args.get('when', 'upcoming')
+  if when not in ('upcoming', 'past', 'all'):
+    abort(400)
+  now = datetime.now(timezone.utc)
+  start = parse_time(request.args['from']) if request.args.get('from') else None
+  end = parse_time(request.args['to'], end_of_day=True) if request.args.get('to') else None
+  if when == 'upcoming':
+    start = max(start, now) if start else now
+  elif when == 'past':
+    end = min(end, now) if end else now
+
+  after = None
+  if request.args.get('after'):
+    after_time, _, after_id = request.args['after'].rpartition(',')
+    if not after_id.isdigit():
+      abort(400)
+    after = (parse_time(after_time), int(after_id))
+
+  filters = {
+    "venue_id": request.args.get('venue_id', type=int),
+    "artist_id": request.args.get('artist_id', type=int),
+  }
+  data, next_after = shows_page(
+    start, end, past=(when == 'past'), after=after, limit=app.config.get('SHOWS_PER_PAGE', 30), **filters
+  )
+
+  next_url = None
+  if next_after:
+    args = request.args.to_dict()
+    args['after'] = f'{next_after[0].isoformat()},{next_after[1]}'
+    next_url = url_for('shows', **args)
+  return render_template('pages/shows.html', shows=data, next_url=next_url)
 
 @app.route('/shows/create')
 def create_shows():
@@ -475,16 +1217,70 @@ def create_shows():
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
+def booking_conflicts(venue_id, artist_id, start_time, end_time):
+  """
+  Returns 'venue' and/or 'artist' when they already have a show overlapping [start_time, end_time)
+  """
+  conflicts = []
+  for owner, column, owner_id in (('venue', Show.venue_id, venue_id), ('artist', Show.artist_id, artist_id)):
+    booked = Show.query.filter(column == owner_id, Show.overlapping(start_time, end_time)).exists()
+    if db.session.query(booked).scalar():
+      conflicts.append(owner)
+  return conflicts
+
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
-  # TODO: insert form data as a new Show record in the db, instead
+  form = ShowForm(request.form)
+  if not form.validate():
+    flash('Please check the show fields.')
+    return render_template('forms/new_show.html', form=form)
 
-  # on successful db insert, flash success
-  flash('Show was successfully listed!')
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Show could not be listed.')
-  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  # A deleted venue is being purged of its shows
+  if form.venue_id.data.isdigit() and db.session.query(
+    db.exists().where(db.and_(Venue.id == int(form.venue_id.data), db.not_(Venue.live())))
+  ).scalar():
+    flash('The venue was deleted.')
+    return render_template('forms/new_show.html', form=form)
+
+  start_time = form.start_time.data.replace(tzinfo=timezone.utc)
+  end_time = start_time + timedelta(minutes=form.duration.data)
+  try:
+    conflicts = booking_conflicts(int(form.venue_id.data), int(form.artist_id.data), start_time, end_time)
+  except ValueError:
+    conflicts = []
+  if conflicts:
+    flash(f'The {" and the ".join(conflicts)} already {"have" if len(conflicts) > 1 else "has"} a show at that time.')
+    return render_template('forms/new_show.html', form=form)
+
+  try:
+    show = Show(
+      artist_id=int(form.artist_id.data),
+      venue_id=int(form.venue_id.data),
+      # The form has no time zone
+      start_time=start_time,
+      end_time=end_time
+    )
+    db.session.add(show)
+    db.session.flush()
+    count_new_show(show)
+    bump_versions(Venue, Venue.id == show.venue_id)
+    bump_versions(Artist, Artist.id == show.artist_id)
+    db.session.commit()
+    # on successful db insert, flash success
+    flash('Show was successfully listed!')
+  except IntegrityError as error:
+    db.session.rollback()
+    if getattr(error.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+      # Booked by another request since the check above
+      flash('The venue or the artist already has a show at that time.')
+      return render_template('forms/new_show.html', form=form)
+    app.logger.exception('Show could not be listed')
+    flash('An error occurred. Show could not be listed.')
+  except (ValueError, SQLAlchemyError):
+    db.session.rollback()
+    app.logger.exception('Show could not be listed')
+    flash('An error occurred. Show could not be listed.')
   return render_template('pages/home.html')
 
 @app.errorhandler(404)
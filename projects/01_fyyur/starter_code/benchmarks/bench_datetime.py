@@ -0,0 +1,75 @@
+"""
+Measures rendering the times of 10k shows with the datetime filter, as it was (dateutil and babel for every show) and
+as it is, with ISO strings and datetimes, with a cold and a warm cache. The warm cache case renders the 1000 soonest
+shows 10 times, as popular pages do.
+
+Run from the starter_code folder with `python benchmarks/bench_datetime.py`. No database is needed: the shows are
+generated in memory.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import babel.dates
+import dateutil.parser
+from jinja2 import Environment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import app, format_datetime, formatted_datetime
+
+SHOWS = 10000
+HOT_SHOWS = 1000
+START = datetime(2035, 1, 1, 20, tzinfo=timezone.utc)
+# The show tile of /shows and of the venue and artist pages, without its fragment cache
+TEMPLATE = '{% for show in shows %}<h4>{{ show.start_time|datetime("full") }}</h4>{% endfor %}'
+
+
+def previous_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def render(template, shows):
+    started = time.perf_counter()
+    html = template.render(shows=shows)
+    return html, time.perf_counter() - started
+
+
+def main():
+    # Two shows an hour, as a busy /shows listing would have
+    times = [START + timedelta(minutes=30 * i) for i in range(SHOWS)]
+    as_strings = [{'start_time': start_time.isoformat()} for start_time in times]
+    as_datetimes = [{'start_time': start_time} for start_time in times]
+    repeats = SHOWS // HOT_SHOWS
+
+    previous = Environment(autoescape=True)
+    previous.filters['datetime'] = previous_format_datetime
+    expected, seconds = render(previous.from_string(TEMPLATE), as_strings)
+    expected_hot = previous.from_string(TEMPLATE).render(shows=as_strings[:HOT_SHOWS]) * repeats
+    print(f'{"previous filter, strings":>28}: {seconds * 1000:8.1f} ms')
+
+    template = app.jinja_env.from_string(TEMPLATE)
+    for name, shows in (('strings', as_strings), ('datetimes', as_datetimes)):
+        formatted_datetime.cache_clear()
+        html, seconds = render(template, shows)
+        assert html == expected
+        print(f'{f"{name}, cold cache":>28}: {seconds * 1000:8.1f} ms')
+
+        html, seconds = render(template, shows[:HOT_SHOWS] * repeats)
+        assert html == expected_hot
+        print(f'{f"{name}, warm cache":>28}: {seconds * 1000:8.1f} ms')
+    print(f'{"cache":>28}: {formatted_datetime.cache_info()}')
+
+    # The same time rendered in another time zone is not taken from the cache
+    paris = timezone(timedelta(hours=2))
+    assert format_datetime(START.astimezone(paris), 'h:mma') != format_datetime(START, 'h:mma')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares loading shows one at a time, as the show form does, with the chunked loads of `flask load`
+
+Run from the starter_code folder with `python benchmarks/bench_load.py <database url>`, e.g.
+`python benchmarks/bench_load.py postgresql://postgres@localhost/fyyur_bench`.
+Use a scratch Postgres database where the pg_trgm and btree_gist extensions are available: its tables are dropped,
+then 20k venues, 5k artists and 100k shows are loaded from generated CSV and NDJSON files.
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+if len(sys.argv) != 2:
+    sys.exit(__doc__)
+os.environ['DATABASE_URL'] = sys.argv[1]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import app, db, Venue, Artist, Show, count_new_show, rebuild_show_counts
+from bulk_load import load_file, validate
+from forms import ShowForm
+
+VENUES = 20000
+ARTISTS = 5000
+SHOWS = 100000
+ONE_AT_A_TIME = 2000
+START = datetime(2030, 1, 1)
+
+
+def write_files(directory):
+    with open(os.path.join(directory, 'venues.csv'), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'city', 'state', 'address', 'phone', 'genres', 'facebook_link'])
+        for i in range(VENUES):
+            writer.writerow([
+                f'Venue {i}', f'City {i % 100}', 'CA', f'{i} Main Street', '555-0100', 'Jazz,Blues',
+                f'https://www.facebook.com/venue{i}'
+            ])
+
+    with open(os.path.join(directory, 'artists.ndjson'), 'w') as file:
+        for i in range(ARTISTS):
+            file.write(json.dumps({
+                'name': f'Artist {i}', 'city': f'City {i % 100}', 'state': 'CA', 'genres': ['Jazz'],
+                'facebook_link': f'https://www.facebook.com/artist{i}'
+            }) + '\n')
+
+    # One hour shows a minute apart: a venue or an artist plays every 5000 minutes at most, so none overlap.
+    # The last ONE_AT_A_TIME shows are loaded one at a time.
+    for name, shows in (('shows.ndjson', range(SHOWS)), ('more_shows.ndjson', range(SHOWS, SHOWS + ONE_AT_A_TIME))):
+        with open(os.path.join(directory, name), 'w') as file:
+            for i in shows:
+                file.write(json.dumps({
+                    'venue': f'Venue {i % VENUES}', 'artist': f'Artist {i % ARTISTS}',
+                    'start_time': (START + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'), 'duration': 60
+                }) + '\n')
+
+
+def load_one_at_a_time(path):
+    """
+    What the show form does for each show, with the venue and artist looked up by name
+    """
+    with open(path) as file:
+        form = ShowForm(formdata=None, meta={'csrf': False})
+        for text in file:
+            row = json.loads(text)
+            row['venue_id'] = db.session.query(Venue.id).filter(Venue.name == row['venue']).scalar()
+            row['artist_id'] = db.session.query(Artist.id).filter(Artist.name == row['artist']).scalar()
+            data = validate(form, row)
+            start_time = data['start_time'].replace(tzinfo=timezone.utc)
+            show = Show(
+                venue_id=int(data['venue_id']), artist_id=int(data['artist_id']), start_time=start_time,
+                end_time=start_time + timedelta(minutes=data['duration'])
+            )
+            db.session.add(show)
+            db.session.flush()
+            count_new_show(show)
+            db.session.commit()
+
+
+def timed(name, rows, load):
+    started = time.perf_counter()
+    load()
+    seconds = time.perf_counter() - started
+    print(f'{name}: {rows} rows in {seconds:.1f} s, {rows / seconds:.0f} rows/s')
+
+
+def main():
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        db.drop_all()
+        db.create_all()
+        rebuild_show_counts()
+        write_files(directory)
+
+        quiet = lambda message: None
+        for kind, name, rows in (('venues', 'venues.csv', VENUES), ('artists', 'artists.ndjson', ARTISTS),
+                                 ('shows', 'shows.ndjson', SHOWS)):
+            timed(f'flask load {kind}', rows, lambda: load_file(kind, os.path.join(directory, name), echo=quiet))
+        more_shows = os.path.join(directory, 'more_shows.ndjson')
+        timed('one show at a time', ONE_AT_A_TIME, lambda: load_one_at_a_time(more_shows))
+
+        print(f'{Show.query.count()} shows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Shows how a venue search runs over 1M venues with and without the trigram index on names
+
+Run from the starter_code folder with `python benchmarks/bench_search.py <database url>`, e.g.
+`python benchmarks/bench_search.py postgresql://postgres@localhost/fyyur_bench`.
+Use a scratch Postgres database where the pg_trgm and btree_gist extensions are available: its Venue, Artist and Show
+tables are dropped and filled with 1M venues. For each search term, the plan and execution time of the search query
+are printed.
+"""
+import os
+import sys
+
+if len(sys.argv) != 2:
+    sys.exit(__doc__)
+os.environ['DATABASE_URL'] = sys.argv[1]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import event
+
+import app as fyyur
+from app import db, Venue, VenueShowCount, search_query
+
+VENUES = 1000000
+TERMS = ['beef', 'venue 0a1b', 'CAFE']
+
+
+def fill_tables():
+    db.session.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    db.session.commit()
+    db.drop_all()
+    db.create_all()
+    # Names like "Venue 3f2a9c01d4e7", so a 4 character term matches about a hundred of them
+    db.session.execute(
+        'INSERT INTO "Venue" (name, city, state, seeking_talent, version) '
+        'SELECT \'Venue \' || substr(md5(i::text), 1, 12), \'San Francisco\', \'CA\', false, 1 '
+        'FROM generate_series(1, :venues) i',
+        {'venues': VENUES}
+    )
+    db.session.commit()
+    db.session.execute('ANALYZE')
+
+
+def scans(plan):
+    """
+    Returns how each table of a plan is read, e.g. "Bitmap Index Scan on ix_Venue_name_trgm"
+    """
+    found = []
+    if 'Scan' in plan['Node Type']:
+        target = plan.get('Index Name') or plan.get('Relation Name')
+        found.append(f"{plan['Node Type']} on {target}")
+    for child in plan.get('Plans', []):
+        found.extend(scans(child))
+    return found
+
+
+def prefix_explain(conn, cursor, statement, parameters, context, executemany):
+    return 'EXPLAIN (ANALYZE, FORMAT JSON) ' + statement, parameters
+
+
+def explain(term):
+    # The search query itself runs, with its parameters, but EXPLAIN ANALYZE returns its plan instead of its rows
+    event.listen(db.engine, 'before_cursor_execute', prefix_explain, retval=True)
+    try:
+        result = db.session.execute(search_query(Venue, VenueShowCount, term).statement).scalar()[0]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', prefix_explain)
+    print(f"  {term!r:14} {result['Execution Time']:10.1f} ms  {', '.join(scans(result['Plan']))}")
+
+
+def main():
+    with fyyur.app.app_context():
+        fill_tables()
+        print('With the trigram index:')
+        for term in TERMS:
+            explain(term)
+
+        db.session.execute('DROP INDEX "ix_Venue_name_trgm"')
+        print('Without it:')
+        for term in TERMS:
+            explain(term)
+        db.session.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Measures loading the typeahead index with 50k venues and 10k artists, and how long suggestions take
+
+Run from the starter_code folder with `python benchmarks/bench_suggest.py`. No database is needed: the names are
+generated in memory.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from suggest import SuggestIndex
+
+VENUES = 50000
+ARTISTS = 10000
+SEARCHES = 2000
+WORDS = ['the', 'blue', 'note', 'jazz', 'club', 'music', 'hall', 'park', 'square', 'live', 'coffee', 'band', 'sax',
+         'wild', 'petals', 'guns', 'piano', 'bar', 'house', 'garden', 'street', 'records', 'lounge', 'cafe', 'rock']
+QUERIES = ['m', 'mu', 'musi', 'the blue', 'jazz cl', 'san fr', 'zzz']
+
+
+def make_rows(count, seed):
+    generate = random.Random(seed)
+    return [
+        (i, ' '.join(generate.sample(WORDS, 3)) + f' {i}', f'City {generate.randrange(500)}', 'CA')
+        for i in range(count)
+    ]
+
+
+def main():
+    venues, artists = make_rows(VENUES, 1), make_rows(ARTISTS, 2)
+    index = SuggestIndex(lambda: (venues, artists))
+
+    started = time.perf_counter()
+    index.refresh()
+    print(f'{"load":>10}: {time.perf_counter() - started:8.2f} s')
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(SEARCHES):
+            started = time.perf_counter()
+            index.search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        median, p99 = statistics.median(timings), timings[int(SEARCHES * 0.99)]
+        print(f'{query!r:>10}: median {median:6.3f} ms  p99 {p99:6.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares building the /venues areas with one query per area and per venue, and with Venue.upcoming_show_counts(),
+which reads the show counters
+
+Run from the starter_code folder with `python benchmarks/bench_venues.py <database url>`, e.g.
+`python benchmarks/bench_venues.py postgresql://postgres@localhost/fyyur_bench`.
+Use a scratch Postgres database where the pg_trgm and btree_gist extensions are available: its Venue, Artist and Show
+tables are dropped and filled with 50k venues in 500 areas and 1M shows.
+"""
+import os
+import sys
+import time
+
+if len(sys.argv) != 2:
+    sys.exit(__doc__)
+os.environ['DATABASE_URL'] = sys.argv[1]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import event
+
+import app as fyyur
+from app import db, Venue, Show, rebuild_show_counts
+
+VENUES = 50000
+AREAS = 500
+ARTISTS = 1000
+SHOWS = 1000000
+
+
+def fill_tables():
+    db.drop_all()
+    db.create_all()
+    db.session.execute(
+        'INSERT INTO "Venue" (name, city, state, seeking_talent, version) '
+        'SELECT \'Venue \' || i, \'City \' || (i % :areas), \'CA\', false, 1 '
+        'FROM generate_series(1, :venues) i',
+        {'venues': VENUES, 'areas': AREAS}
+    )
+    db.session.execute(
+        'INSERT INTO "Artist" (name, city, state, seeking_venue, version) '
+        'SELECT \'Artist \' || i, \'City \' || (i % :areas), \'CA\', false, 1 '
+        'FROM generate_series(1, :artists) i',
+        {'artists': ARTISTS, 'areas': AREAS}
+    )
+    # One hour shows a minute apart, over about two years around now so that half of them are upcoming. A venue or an
+    # artist has a show every 1000 minutes at most, so none of them overlap.
+    db.session.execute(
+        'INSERT INTO "Show" (artist_id, venue_id, start_time, end_time) '
+        'SELECT 1 + i % :artists, 1 + (i::bigint * 7919) % :venues, '
+        'now() + (i - :shows / 2) * interval \'1 minute\', now() + (i - :shows / 2 + 60) * interval \'1 minute\' '
+        'FROM generate_series(1, :shows) i',
+        {'artists': ARTISTS, 'venues': VENUES, 'shows': SHOWS}
+    )
+    db.session.commit()
+    rebuild_show_counts()
+    db.session.execute('ANALYZE')
+
+
+def areas_per_row():
+    areas = []
+    for city, state in db.session.query(Venue.city, Venue.state).distinct().order_by(Venue.state, Venue.city):
+        venues = []
+        for venue in Venue.query.filter_by(city=city, state=state).order_by(Venue.name):
+            venues.append({
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': Show.query.filter(Show.venue_id == venue.id, Show.upcoming()).count()
+            })
+        areas.append({'city': city, 'state': state, 'venues': venues})
+    return areas
+
+
+def areas_aggregated():
+    with fyyur.app.test_request_context():
+        fyyur.app.view_functions['venues']()
+
+
+def measure(label, build):
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    started = time.perf_counter()
+    build()
+    seconds = time.perf_counter() - started
+    event.remove(db.engine, 'before_cursor_execute', listener)
+    db.session.remove()
+    print(f'{label:>16}: {seconds:8.2f} s  {len(queries):8,} queries')
+
+
+def main():
+    with fyyur.app.app_context():
+        fill_tables()
+        measure('per area/venue', areas_per_row)
+        measure('/venues', areas_aggregated)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+Bulk loading of venues, artists and shows from CSV or NDJSON files, run with `flask load`
+
+Rows are read as a stream and handled in chunks, each in its own transaction. The rows of a chunk are checked with
+the rules of the venue, artist and show forms, the venues and artists that shows refer to by name are looked up with
+one query per chunk, and the valid rows are written with COPY on Postgres (batched inserts elsewhere). Invalid rows
+are reported and skipped. When a chunk cannot be written, e.g. because a show overlaps another one, the chunks before
+it stay loaded and the load stops.
+
+Show counters and the versions of the venues and artists of new shows are updated along. The suggestion indexes of
+running apps pick the new venues and artists up when they are next reloaded.
+"""
+import csv
+import io
+import json
+import os
+import time
+from datetime import timedelta, timezone
+from itertools import islice
+
+import click
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+from wtforms import SelectMultipleField
+
+from app import (
+    db, Venue, Artist, Show, VenueGenre, ArtistGenre, VENUE_FIELDS, ARTIST_FIELDS, bump_versions, count_new_shows
+)
+from forms import VenueForm, ArtistForm, ShowForm
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# Kind -> the form checking its rows, its model, the model of its genres and the columns set from the form
+OWNERS = {
+    'venues': (VenueForm, Venue, VenueGenre, VENUE_FIELDS),
+    'artists': (ArtistForm, Artist, ArtistGenre, ARTIST_FIELDS),
+}
+
+
+class LoadError(Exception):
+    """
+    A chunk could not be written, the rows before first_line are loaded
+    """
+    def __init__(self, message, first_line):
+        super().__init__(message)
+        self.first_line = first_line
+
+
+def read_rows(path, file_format=None):
+    """
+    Yields (line number, row) for each row of a file, a row being a dict, or None when it cannot be read. In CSV
+    files, genres are separated by commas, e.g. "Jazz,Swing".
+    """
+    file_format = file_format or FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in ('csv', 'ndjson'):
+        raise click.UsageError(f'Cannot tell the format of {path}, use --format')
+
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                if row.get('genres'):
+                    row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+                yield reader.line_num, row
+        else:
+            for line, text in enumerate(file, 1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except ValueError:
+                    yield line, None
+
+
+def validate(form, row):
+    """
+    Returns the data of a row checked by a form, or raises ValueError with the errors of the form. The form is reused
+    from row to row, which is much faster than building one per row.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('not a row of fields')
+
+    formdata = MultiDict()
+    for name, field in form._fields.items():
+        value = row.get(name)
+        if isinstance(field, SelectMultipleField):
+            formdata.setlist(name, [str(item) for item in value or []])
+        else:
+            # A missing field is empty, rather than left to its default, e.g. the start time of a show
+            formdata.add(name, '' if value is None else str(value))
+    form.process(formdata)
+    if not form.validate():
+        raise ValueError('; '.join(f'{name}: {" ".join(errors)}' for name, errors in form.errors.items()))
+    return form.data
+
+
+def resolve_references(rows):
+    """
+    Sets the venue_id and artist_id of the show rows naming their venue and artist instead (venue and artist fields),
+    and checks that the venues and artists exist and are not deleted, with one query per model. Returns the errors by
+    line.
+    """
+    errors = {}
+    rows = [(line, row) for line, row in rows if isinstance(row, dict)]
+    for model, field in ((Venue, 'venue'), (Artist, 'artist')):
+        id_field = f'{field}_id'
+        names = {row[field] for line, row in rows if not row.get(id_field) and row.get(field)}
+        ids = {str(row[id_field]) for line, row in rows if row.get(id_field)}
+
+        # Name -> ids of the venues or artists with that name
+        named = {}
+        if names:
+            # One expanding parameter rather than one parameter per name, which is much faster to compile
+            for model_id, name in db.session.query(model.id, model.name).filter(
+                model.live(), model.name.in_(db.bindparam('names', expanding=True))
+            ).params(names=list(names)):
+                named.setdefault(name, []).append(model_id)
+        ids = [int(model_id) for model_id in ids if model_id.isdigit()]
+        known = set()
+        if ids:
+            known = {str(model_id) for model_id, in db.session.query(model.id).filter(
+                model.live(), model.id.in_(db.bindparam('ids', expanding=True))
+            ).params(ids=ids)}
+
+        for line, row in rows:
+            if row.get(id_field):
+                if str(row[id_field]) not in known:
+                    errors[line] = f'{id_field}: no {field} {row[id_field]}'
+            elif row.get(field):
+                matches = named.get(row[field], [])
+                if len(matches) == 1:
+                    row[id_field] = matches[0]
+                else:
+                    errors[line] = f'{field}: {"several" if matches else "no"} {field}s named {row[field]}'
+    return errors
+
+
+def allocate_ids(model, count):
+    """
+    Returns ids for count new rows of a model, so that rows of other tables can refer to them before they are written
+    """
+    if db.session.bind.dialect.name == 'postgresql':
+        return [model_id for model_id, in db.session.execute(
+            'SELECT nextval(pg_get_serial_sequence(:table, \'id\')) FROM generate_series(1, :count)',
+            {'table': f'"{model.__tablename__}"', 'count': count}
+        )]
+    # Other databases, e.g. SQLite for local tests, are not written concurrently
+    first = (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+    return list(range(first, first + count))
+
+
+def write(table, records):
+    """
+    Writes records, dicts of column values, with COPY on Postgres and a batched insert elsewhere
+    """
+    if not records:
+        return
+    columns = list(records[0])
+    # COPY does not apply the defaults of the model
+    for column in table.columns:
+        if column.key not in columns and column.default is not None and column.default.is_scalar:
+            columns.append(column.key)
+            for record in records:
+                record[column.key] = column.default.arg
+
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        connection.execute(table.insert(), records)
+        return
+
+    # Empty fields are NULL
+    data = io.StringIO()
+    writer = csv.writer(data)
+    for record in records:
+        writer.writerow([record[column] for column in columns])
+    data.seek(0)
+    names = ', '.join(f'"{column}"' for column in columns)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{table.name}" ({names}) FROM STDIN WITH (FORMAT csv)', data)
+
+
+def load_owners(kind, rows):
+    """
+    Writes the checked rows of venues or artists, as (line, form data), with their genres
+    """
+    form_class, model, genre_model, columns = OWNERS[kind]
+    owner = f'{model.__tablename__.lower()}_id'
+    records, genres = [], []
+    for model_id, (line, data) in zip(allocate_ids(model, len(rows)), rows):
+        records.append({'id': model_id, **{column: data[column] or None for column in columns}})
+        genres.extend({'genre': genre, owner: model_id} for genre in set(data['genres']))
+    write(model.__table__, records)
+    write(genre_model.__table__, genres)
+
+
+def load_shows(rows):
+    """
+    Writes the checked rows of shows, as (line, form data), counts them and bumps the versions of their venues and
+    artists
+    """
+    records = []
+    for line, data in rows:
+        # The form has no time zone
+        start_time = data['start_time'].replace(tzinfo=timezone.utc)
+        records.append({
+            'venue_id': int(data['venue_id']),
+            'artist_id': int(data['artist_id']),
+            'start_time': start_time,
+            'end_time': start_time + timedelta(minutes=data['duration'])
+        })
+    write(Show.__table__, records)
+    count_new_shows(records)
+    for model, owner in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+        ids = sorted({record[owner] for record in records})
+        bump_versions(model, model.id.in_(db.bindparam('ids', ids, expanding=True)))
+
+
+def load_chunk(kind, chunk, form, report):
+    """
+    Checks and writes the rows of a chunk, as (line, row), in one transaction. Returns how many rows were written.
+    """
+    errors = resolve_references(chunk) if kind == 'shows' else {}
+    valid = []
+    for line, row in chunk:
+        try:
+            if line in errors:
+                raise ValueError(errors[line])
+            valid.append((line, validate(form, row)))
+        except ValueError as error:
+            report(line, error)
+
+    try:
+        load_shows(valid) if kind == 'shows' else load_owners(kind, valid)
+        db.session.commit()
+    except (SQLAlchemyError, db.engine.dialect.dbapi.Error) as error:
+        db.session.rollback()
+        # Without the statement and its parameters, which are the whole chunk
+        raise LoadError(str(getattr(error, 'orig', error)).strip(), chunk[0][0])
+    return len(valid)
+
+
+def load_file(kind, path, file_format=None, chunk_size=1000, echo=None):
+    """
+    Loads the venues, artists or shows of a file, reporting invalid rows and progress with echo(message), and returns
+    how many rows were loaded and skipped, and the rows read per second
+    """
+    echo = echo or (lambda message: click.echo(message, err=True))
+    rows = read_rows(path, file_format)
+    form_class = ShowForm if kind == 'shows' else OWNERS[kind][0]
+    form = form_class(formdata=None, meta={'csrf': False})
+    loaded = read = 0
+    started = time.perf_counter()
+
+    def report(line, error):
+        echo(f'{path}:{line}: {error}')
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        loaded += load_chunk(kind, chunk, form, report)
+        read += len(chunk)
+        rate = read / max(time.perf_counter() - started, 1e-9)
+        echo(f'{loaded} {kind} loaded, {read - loaded} skipped ({rate:.0f} rows/s)')
+
+    return {
+        'loaded': loaded,
+        'skipped': read - loaded,
+        'rows_per_second': read / max(time.perf_counter() - started, 1e-9)
+    }
@@ -1,4 +1,5 @@
 import os
+from sqlalchemy.engine.url import make_url
 SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -7,7 +8,45 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 DEBUG = True
 
 # Connect to the database
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://localhost:5432/fyyur')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# With psycopg2, statements run with many rows of parameters (e.g. the batched updates of `flask load`) are sent in
+# pages of rows rather than in one round trip per row. Needs SQLAlchemy 1.3.7 or later.
+if make_url(SQLALCHEMY_DATABASE_URI).get_driver_name() == 'psycopg2':
+    SQLALCHEMY_ENGINE_OPTIONS = {'executemany_mode': 'values'}
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = '<Put your local database url>'
+# Seconds between two agings of the show counters by listing pages, which move started shows from upcoming to past.
+# `flask show-counts` does it too, e.g. from cron.
+SHOW_COUNTS_AGING_INTERVAL = 60
+
+# Most results a venue or artist search returns, the most relevant first
+SEARCH_RESULTS_MAX = 20
+
+# Seconds before the typeahead index of venue, artist and city names is reloaded. Changes made by this process show
+# up right away, this bounds how long changes made by other worker processes go unseen.
+SUGGEST_INDEX_TTL = 300
+
+# Most suggestions /search/suggest returns
+SUGGEST_RESULTS_MAX = 20
+
+# Shows per page of /shows
+SHOWS_PER_PAGE = 30
+
+# Longest period, in days, /venues/<venue_id>/availability lists the free slots of
+AVAILABILITY_DAYS_MAX = 31
+
+# Most rendered page fragments (venue and artist page bodies, show tiles) kept in memory by each worker process, 0 to
+# disable the fragment cache
+FRAGMENT_CACHE_SIZE = 1024
+
+# Most formatted dates and times remembered by the datetime filter of templates
+DATETIME_FILTER_CACHE_SIZE = 4096
+
+# Shows of a deleted venue deleted per transaction by its purge, and seconds between two of these transactions
+VENUE_PURGE_BATCH_SIZE = 1000
+VENUE_PURGE_PAUSE = 0.1
+
+# Whether deleting a venue starts purging it in a thread of the process, False to leave purges to
+# `flask purge-venues`, e.g. from cron
+VENUE_PURGE_IN_BACKGROUND = True
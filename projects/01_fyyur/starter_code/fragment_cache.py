@@ -0,0 +1,80 @@
+"""
+In-memory cache of rendered page fragments, e.g. the body of a venue page or the tile of a show
+
+Fragments are keyed by the ids and versions of the venues and artists they show, e.g. ('venue', 1, 3). Venues and
+artists have a version column, bumped in the transaction that changes them or one of their shows, so a changed
+venue is looked up under a new key and its old fragments are never served again, by any worker process. They are
+dropped as the least recently used ones. A fragment can also expire, e.g. when the next upcoming show of a venue
+page starts and becomes a past show.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """
+    Bounded LRU of rendered fragments. A `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """
+        Returns the fragment cached under key, or None if it has to be rendered
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                fragment, expires_at = entry
+                if expires_at is None or (now or time.time()) < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return fragment
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, fragment, expires_at=None):
+        """
+        Caches a fragment under key, until expires_at (a timestamp) if given
+        """
+        if not self.maxsize:
+            return
+
+        with self._lock:
+            self._entries[key] = (fragment, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def render(self, key, render, expires_at=None):
+        """
+        Returns the fragment cached under key, calling `render()` to build it if needed
+        """
+        fragment = self.get(key)
+        if fragment is None:
+            fragment = render()
+            self.put(key, fragment, expires_at)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize
+        }
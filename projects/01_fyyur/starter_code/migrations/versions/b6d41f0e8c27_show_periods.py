@@ -0,0 +1,39 @@
+"""Show end times, and exclusion constraints against double bookings.
+
+Revision ID: b6d41f0e8c27
+Revises: 7a3f2c9d4e15
+Create Date: 2026-10-18 06:12:48.603914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d41f0e8c27'
+down_revision = '7a3f2c9d4e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(timezone=True), nullable=True))
+    # Existing shows are taken to last two hours, the default of the show form
+    op.execute('UPDATE "Show" SET end_time = start_time + interval \'2 hours\'')
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_Show_period', 'Show', 'end_time > start_time')
+
+    # Fails if a venue or an artist already has overlapping shows, which have to be moved or removed first
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for owner in ('venue', 'artist'):
+        op.execute(
+            f'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{owner}_period" '
+            f'EXCLUDE USING gist ({owner}_id WITH =, tstzrange(start_time, end_time) WITH &&)'
+        )
+
+
+def downgrade():
+    op.drop_constraint('ex_Show_artist_period', 'Show')
+    op.drop_constraint('ex_Show_venue_period', 'Show')
+    op.drop_constraint('ck_Show_period', 'Show')
+    op.drop_column('Show', 'end_time')
@@ -0,0 +1,48 @@
+"""Soft deletion of venues, purged of their shows in the background.
+
+Revision ID: e7b3c5a1f482
+Revises: d1f8a2b6c934
+Create Date: 2026-10-18 08:21:37.915604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3c5a1f482'
+down_revision = 'd1f8a2b6c934'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('VenuePurge',
+    sa.Column('venue_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('requested_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('shows_purged', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('venue_id')
+    )
+    op.add_column('Venue', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Listings and searches only read venues that are not deleted
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+    op.drop_index('ix_Venue_city', table_name='Venue')
+    op.create_index('ix_Venue_city', 'Venue', ['city'], unique=False, postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_Venue_city', table_name='Venue')
+    op.create_index('ix_Venue_city', 'Venue', ['city'], unique=False)
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+    # Deleted venues without shows left are removed, the ones still being purged come back with their shows left
+    op.execute('DELETE FROM "Venue" WHERE deleted_at IS NOT NULL AND id NOT IN (SELECT venue_id FROM "Show")')
+    op.drop_column('Venue', 'deleted_at')
+    op.drop_table('VenuePurge')
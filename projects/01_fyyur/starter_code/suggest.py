@@ -0,0 +1,248 @@
+"""
+In-memory index of venue, artist and city names for typeahead suggestions
+
+Every word of a name is kept in a sorted list, so the names having a word that starts with the typed prefix are a
+bisect away, and every name is also kept in a list sorted by rank, shortest first, which answers prefixes too common
+to look at all of their names. The index is loaded from the database in the background and reloaded once it is older
+than its ttl, which bounds how long changes made by other worker processes go unseen. Changes made by this process
+are applied right away with put() and remove().
+"""
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import time
+import unicodedata
+
+WORD = re.compile(r'\w+')
+# Sorts after any word starting with a given prefix
+LAST_CHARACTER = '\U0010ffff'
+
+
+def normalize(text):
+    """
+    Lower case without accents, so "Café" is found by typing "cafe"
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def words(text):
+    return WORD.findall(normalize(text))
+
+
+class Suggestion:
+    __slots__ = ('kind', 'key', 'name', 'normalized', 'words', 'spaced_words', 'city', 'state', 'rank')
+
+    def __init__(self, kind, key, name, city, state):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        self.normalized = normalize(name)
+        self.words = tuple(sorted(set(WORD.findall(self.normalized))))
+        # " blue club the", so that " cl" in it tells whether a word starts with "cl"
+        self.spaced_words = ' ' + ' '.join(self.words)
+        self.city = city
+        self.state = state
+        # Shortest names first, then alphabetically
+        self.rank = (len(name), self.normalized, kind, str(key))
+
+    def format(self):
+        suggestion = {
+            'type': self.kind,
+            'name': self.name,
+            'city': self.city,
+            'state': self.state
+        }
+        if self.kind != 'area':
+            suggestion['id'] = self.key
+        return suggestion
+
+
+class SuggestIndex:
+    def __init__(self, loader, ttl=300, scan_max=2000):
+        """
+        loader() returns the venues and artists to index, as two iterables of (id, name, city, state).
+        A search looks at no more than scan_max names, so a one letter prefix stays fast: when more words start with
+        the prefix, names are scanned shortest first instead, see search().
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.scan_max = scan_max
+        self.loaded_at = None
+        self._suggestions = {}
+        self._words = []
+        # (rank, kind, key) of every suggestion, best first
+        self._ranked = []
+        self._areas = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # Changes made while the index is reloaded, replayed over the loaded index
+        self._pending = []
+
+    @property
+    def ready(self):
+        return self.loaded_at is not None
+
+    def is_stale(self):
+        return not self.ready or time.monotonic() - self.loaded_at > self.ttl
+
+    def refresh(self):
+        """
+        Loads the index again, the current one keeps answering meanwhile
+        """
+        with self._lock:
+            self._refreshing = True
+        self._load()
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh unless one is already running
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._load, kwargs={'quietly': True}, daemon=True).start()
+
+    def _load(self, quietly=False):
+        try:
+            venues, artists = self.loader()
+            index = SuggestIndex(self.loader, self.ttl, self.scan_max)
+            for kind, rows in (('venue', venues), ('artist', artists)):
+                for key, name, city, state in rows:
+                    index._put(kind, key, name, city, state, sort=False)
+            index._words.sort()
+            index._ranked.sort()
+        except Exception:
+            with self._lock:
+                self._refreshing = False
+                self._pending = []
+            if quietly:
+                # The index stays as it was, and the next search tries again
+                return
+            raise
+
+        with self._lock:
+            for change in self._pending:
+                index._put(*change) if len(change) == 5 else index._remove(*change)
+            self._suggestions, self._words, self._ranked = index._suggestions, index._words, index._ranked
+            self._areas = index._areas
+            self.loaded_at = time.monotonic()
+            self._refreshing = False
+            self._pending = []
+
+    def put(self, kind, key, name, city, state):
+        """
+        Adds or replaces a venue or an artist
+        """
+        with self._lock:
+            if self._refreshing:
+                self._pending.append((kind, key, name, city, state))
+            self._put(kind, key, name, city, state)
+
+    def remove(self, kind, key):
+        with self._lock:
+            if self._refreshing:
+                self._pending.append((kind, key))
+            self._remove(kind, key)
+
+    def search(self, query, limit=10):
+        """
+        Returns up to limit suggestions whose words start with the words of query, names starting with the query
+        first, then the shortest. Returns None while the index is not loaded, and reloads it once stale.
+
+        When more than scan_max words start with the longest word of the query, e.g. for a single letter, the
+        scan_max shortest names are scanned instead. The results are then exact unless fewer than limit of those
+        start with the query, in which case longer names starting with it may be missed.
+        """
+        if self.is_stale():
+            self.refresh_in_background()
+        if not self.ready:
+            return None
+
+        query_words = words(query)
+        if not query_words:
+            return []
+        normalized = ' '.join(query_words)
+        # The longest word is usually the most selective
+        prefix = max(query_words, key=len)
+        others = [' ' + word for word in query_words if word != prefix]
+
+        with self._lock:
+            start = bisect.bisect_left(self._words, (prefix,))
+            end = bisect.bisect_left(self._words, (prefix + LAST_CHARACTER,), start)
+            if end - start > self.scan_max:
+                ranked = self._scan_ranked([' ' + prefix] + others, normalized, limit)
+                return [suggestion.format() for suggestion in ranked]
+            matches = {self._suggestions[(kind, key)] for _, kind, key in self._words[start:end]}
+        if others:
+            matches = [s for s in matches if all(other in s.spaced_words for other in others)]
+
+        ranked = heapq.nsmallest(limit, matches, key=lambda s: (not s.normalized.startswith(normalized), s.rank))
+        return [suggestion.format() for suggestion in ranked]
+
+    def _scan_ranked(self, prefixes, normalized, limit):
+        """
+        Returns the best limit suggestions having a word starting with each of prefixes (" mus"), looking at the
+        scan_max shortest names. The scan stops once limit names start with the query, as they rank before any other.
+        """
+        starting, others = [], []
+        for _, kind, key in itertools.islice(self._ranked, self.scan_max):
+            suggestion = self._suggestions[(kind, key)]
+            spaced_words = suggestion.spaced_words
+            if not all(prefix in spaced_words for prefix in prefixes):
+                continue
+            if suggestion.normalized.startswith(normalized):
+                starting.append(suggestion)
+                if len(starting) == limit:
+                    break
+            elif len(others) < limit:
+                others.append(suggestion)
+        return (starting + others)[:limit]
+
+    def _put(self, kind, key, name, city, state, sort=True):
+        """
+        With sort=False, words are appended and the word list must be sorted afterwards, which is much faster when
+        loading many names
+        """
+        self._remove(kind, key)
+        self._add(Suggestion(kind, key, name, city, state), sort)
+
+        area = (city, state)
+        if area not in self._areas:
+            self._areas[area] = 0
+            self._add(Suggestion('area', f'{city}, {state}', f'{city}, {state}', city, state), sort)
+        self._areas[area] += 1
+
+    def _remove(self, kind, key):
+        suggestion = self._suggestions.get((kind, key))
+        if suggestion is None:
+            return
+        self._discard(suggestion)
+
+        area = (suggestion.city, suggestion.state)
+        self._areas[area] -= 1
+        if not self._areas[area]:
+            del self._areas[area]
+            self._discard(self._suggestions[('area', f'{suggestion.city}, {suggestion.state}')])
+
+    def _add(self, suggestion, sort=True):
+        self._suggestions[(suggestion.kind, suggestion.key)] = suggestion
+        if sort:
+            bisect.insort(self._ranked, (suggestion.rank, suggestion.kind, suggestion.key))
+        else:
+            self._ranked.append((suggestion.rank, suggestion.kind, suggestion.key))
+        for word in suggestion.words:
+            if sort:
+                bisect.insort(self._words, (word, suggestion.kind, suggestion.key))
+            else:
+                self._words.append((word, suggestion.kind, suggestion.key))
+
+    def _discard(self, suggestion):
+        del self._suggestions[(suggestion.kind, suggestion.key)]
+        del self._ranked[bisect.bisect_left(self._ranked, (suggestion.rank, suggestion.kind, suggestion.key))]
+        for word in suggestion.words:
+            index = bisect.bisect_left(self._words, (word, suggestion.kind, suggestion.key))
+            del self._words[index]
@@ -0,0 +1,740 @@
+import html
+import os
+import re
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+# The app connects when it is imported, to a scratch SQLite database here, or to the scratch database at
+# TEST_DATABASE_URL, e.g. a Postgres one where the pg_trgm extension is available
+database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL', 'sqlite:///' + database.name)
+
+import babel.dates
+from sqlalchemy import event
+
+from app import (
+    app, db, Venue, Artist, Show, ArtistShowCount, ShowCountWatermark, VenueShowCount, age_show_counts, as_utc,
+    booking_conflicts, bump_versions, count_new_shows, format_datetime, fragment_cache, free_slots, purge_batch,
+    purge_venues, rebuild_show_counts, shows_page
+)
+from bulk_load import load_file
+from suggest import SuggestIndex
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents a test case run in an app context, on tables created for each test"""
+
+    # Config values set for the tests of the class, restored after each test
+    config = {'WTF_CSRF_ENABLED': False}
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        self.previous_config = {name: app.config[name] for name in self.config if name in app.config}
+        app.config.update(self.config)
+        db.create_all()
+        # Each test starts the ids and versions over
+        fragment_cache.clear()
+        self.seed()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        for name in self.config:
+            app.config.pop(name)
+        app.config.update(self.previous_config)
+        self.context.pop()
+
+    def seed(self):
+        """Adds the rows the tests of the class start with"""
+
+
+class ShowPagesTestCase(FyyurTestCase):
+    """This class represents the venue and artist pages test case"""
+
+    def seed(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA')
+        artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        self.venue_id, self.artist_id = venue.id, artist.id
+
+    def add_shows(self, count):
+        now = datetime.now(timezone.utc)
+        for days in range(count):
+            # Half of them past, half upcoming, each with its own artist. One hour long, at times depending on count
+            # so that the shows of two calls do not overlap.
+            artist = Artist(name=f'Artist {days}', city='San Francisco', state='CA', image_link=f'/{days}.png')
+            start_time = now + timedelta(days=days - count // 2, hours=1, minutes=5 * count)
+            db.session.add(Show(
+                venue_id=self.venue_id, artist=artist, start_time=start_time, end_time=start_time + timedelta(hours=1)
+            ))
+            db.session.add(Show(
+                venue_id=self.venue_id, artist_id=self.artist_id,
+                start_time=start_time + timedelta(hours=2), end_time=start_time + timedelta(hours=3)
+            ))
+        bump_versions(Venue, Venue.id == self.venue_id)
+        bump_versions(Artist, Artist.id == self.artist_id)
+        db.session.commit()
+        db.session.remove()
+
+    def count_queries(self, path):
+        queries = []
+        thread = threading.get_ident()
+
+        def count(*args):
+            # Other threads, e.g. loading the suggestion index, are not part of the page
+            if threading.get_ident() == thread:
+                queries.append(1)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.client.get(path)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_venue_page_queries_do_not_grow_with_shows(self):
+        path = f'/venues/{self.venue_id}'
+        self.client.get(path)
+        self.add_shows(2)
+        few = self.count_queries(path)
+        self.add_shows(40)
+        many = self.count_queries(path)
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 3)
+
+    def test_artist_page_queries_do_not_grow_with_shows(self):
+        path = f'/artists/{self.artist_id}'
+        self.client.get(path)
+        self.add_shows(2)
+        few = self.count_queries(path)
+        self.add_shows(40)
+        many = self.count_queries(path)
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 3)
+
+    def test_venue_page_splits_past_and_upcoming_shows(self):
+        self.add_shows(4)
+        response = self.client.get(f'/venues/{self.venue_id}')
+
+        self.assertIn(b'4 Upcoming Shows', response.data)
+        self.assertIn(b'4 Past Shows', response.data)
+        self.assertIn(b'Artist 3', response.data)
+
+    def test_missing_venue(self):
+        self.assertEqual(self.client.get('/venues/1000').status_code, 404)
+
+
+class ShowsPageTestCase(FyyurTestCase):
+    """This class represents the /shows listing test case"""
+
+    def seed(self):
+        venues = [Venue(name=f'Venue {i}', city='San Francisco', state='CA') for i in range(3)]
+        artists = [Artist(name=f'Artist {i}', city='San Francisco', state='CA') for i in range(3)]
+        self.now = datetime.now(timezone.utc)
+        # Three shows a day, starting at the same time at three venues, from 10 days ago to 9 days from now
+        for days in range(-10, 10):
+            start_time = self.now + timedelta(days=days, hours=1)
+            db.session.add_all([
+                Show(venue=venue, artist=artist, start_time=start_time, end_time=start_time + timedelta(hours=2))
+                for venue, artist in zip(venues, artists)
+            ])
+        db.session.commit()
+        self.venue_id = venues[0].id
+
+    def read_pages(self, **filters):
+        shows, after = shows_page(limit=7, **filters)
+        pages = [shows]
+        while after:
+            shows, after = shows_page(limit=7, after=after, **filters)
+            pages.append(shows)
+        return pages
+
+    def test_pages_have_every_show_once_in_order(self):
+        pages = self.read_pages(start=self.now)
+        shows = [show for page in pages for show in page]
+
+        self.assertEqual(len(shows), 30)
+        self.assertEqual([len(page) for page in pages], [7, 7, 7, 7, 2])
+        self.assertEqual(shows, sorted(shows, key=lambda show: show['start_time']))
+        self.assertTrue(all(as_utc(show['start_time']) > self.now for show in shows))
+
+    def test_past_pages_are_latest_first(self):
+        pages = self.read_pages(end=self.now, past=True, venue_id=self.venue_id)
+        shows = [show for page in pages for show in page]
+
+        self.assertEqual(len(shows), 10)
+        self.assertEqual(shows, sorted(shows, key=lambda show: show['start_time'], reverse=True))
+
+    def test_date_window(self):
+        day = (self.now + timedelta(days=3)).date().isoformat()
+        response = self.client.get(f'/shows?from={day}&to={day}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.count(b'tile-show'), 3)
+
+    def test_next_page_link(self):
+        app.config['SHOWS_PER_PAGE'] = 20
+        try:
+            first = self.client.get('/shows')
+            self.assertEqual(first.data.count(b'tile-show'), 20)
+            next_url = re.search(r'href="(/shows\?after=[^"]+)"', first.data.decode()).group(1)
+            second = self.client.get(html.unescape(next_url))
+        finally:
+            app.config['SHOWS_PER_PAGE'] = 30
+
+        self.assertEqual(second.data.count(b'tile-show'), 10)
+        self.assertNotIn(b'More shows', second.data)
+
+    def test_bad_filters(self):
+        self.assertEqual(self.client.get('/shows?from=tomorrow').status_code, 400)
+        self.assertEqual(self.client.get('/shows?when=soon').status_code, 400)
+        self.assertEqual(self.client.get('/shows?after=2035-04-01').status_code, 400)
+
+
+class BookingTestCase(FyyurTestCase):
+    """This class represents the show booking test case"""
+
+    def seed(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA')
+        artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+        other_artist = Artist(name='Matt Quevedo', city='New York', state='NY')
+        # 20:00 to 22:00 and 23:00 to 23:30
+        self.day = datetime(2035, 4, 1, tzinfo=timezone.utc)
+        db.session.add_all([
+            other_artist,
+            Show(venue=venue, artist=artist, start_time=self.day.replace(hour=20), end_time=self.day.replace(hour=22)),
+            Show(venue=venue, artist=artist, start_time=self.day.replace(hour=23),
+                 end_time=self.day.replace(hour=23, minute=30))
+        ])
+        db.session.commit()
+        self.venue_id, self.artist_id, self.other_artist_id = venue.id, artist.id, other_artist.id
+
+    def test_conflicts(self):
+        at = self.day.replace(hour=21)
+        self.assertEqual(
+            booking_conflicts(self.venue_id, self.other_artist_id, at, at + timedelta(hours=1)), ['venue']
+        )
+        self.assertEqual(
+            booking_conflicts(self.venue_id, self.artist_id, at, at + timedelta(hours=1)), ['venue', 'artist']
+        )
+        # Back to back
+        at = self.day.replace(hour=22)
+        self.assertEqual(booking_conflicts(self.venue_id, self.artist_id, at, at + timedelta(hours=1)), [])
+
+    def test_double_booking_is_refused(self):
+        response = self.client.post('/shows/create', data={
+            'artist_id': self.other_artist_id,
+            'venue_id': self.venue_id,
+            'start_time': '2035-04-01 21:00:00',
+            'duration': 60
+        })
+
+        self.assertIn(b'The venue already has a show at that time.', response.data)
+        self.assertEqual(Show.query.count(), 2)
+
+    @unittest.skipUnless(app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'), 'needs exclusion constraints')
+    def test_concurrent_double_booking_is_refused(self):
+        # Both requests find the venue free before either lists its show
+        checked = threading.Barrier(2, timeout=5)
+
+        def checked_conflicts(*args):
+            conflicts = booking_conflicts(*args)
+            checked.wait()
+            return conflicts
+
+        responses = []
+
+        def book(artist_id):
+            responses.append(app.test_client().post('/shows/create', data={
+                'artist_id': artist_id,
+                'venue_id': self.venue_id,
+                'start_time': '2035-04-02 20:00:00',
+                'duration': 60
+            }).data)
+
+        threads = [
+            threading.Thread(target=book, args=(artist_id,)) for artist_id in (self.artist_id, self.other_artist_id)
+        ]
+        with mock.patch('app.booking_conflicts', checked_conflicts):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(sorted(b'successfully listed' in data for data in responses), [False, True])
+        self.assertTrue(any(b'The venue or the artist already has a show at that time.' in data for data in responses))
+        self.assertEqual(Show.query.count(), 3)
+
+    def test_free_slots(self):
+        slots = free_slots(self.venue_id, self.day.replace(hour=18), self.day + timedelta(days=1))
+
+        self.assertEqual(slots, [
+            (self.day.replace(hour=18), self.day.replace(hour=20)),
+            (self.day.replace(hour=22), self.day.replace(hour=23)),
+            (self.day.replace(hour=23, minute=30), self.day + timedelta(days=1)),
+        ])
+
+    def test_availability(self):
+        response = self.client.get(
+            f'/venues/{self.venue_id}/availability?from=2035-04-01T21:00&to=2035-04-01&minutes=45'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['free'], [
+            {'start': '2035-04-01T22:00:00+00:00', 'end': '2035-04-01T23:00:00+00:00'}
+        ])
+        self.assertEqual(self.client.get(f'/venues/{self.venue_id}/availability?from=2035-04-02&to=2035-04-01')
+                         .status_code, 400)
+
+
+class GenreTestCase(FyyurTestCase):
+    """This class represents the genre browsing test case"""
+
+    def seed(self):
+        db.session.add_all([
+            Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz', 'Swing']),
+            Venue(name='The Dueling Pianos Bar', city='New York', state='NY', genres=['Classical', 'Jazz']),
+            Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll']),
+            Artist(name='The Wild Sax Band', city='San Francisco', state='CA', genres=['Jazz', 'Classical']),
+            Artist(name='Matt Quevedo', city='New York', state='NY', genres=['Jazz']),
+        ])
+        db.session.commit()
+
+    def test_genres_are_kept_in_order(self):
+        venue = Venue.query.filter_by(name='The Musical Hop').one()
+        venue.genres.append('Folk')
+        db.session.commit()
+
+        self.assertEqual(list(Venue.query.get(venue.id).genres), ['Folk', 'Jazz', 'Swing'])
+        response = self.client.get(f'/venues/{venue.id}')
+        self.assertIn(b'href="/venues?genre=Folk"', response.data)
+
+    def test_artists_by_genre_and_city(self):
+        response = self.client.get('/artists?genre=Jazz&city=San Francisco')
+
+        self.assertIn(b'The Wild Sax Band', response.data)
+        self.assertNotIn(b'Matt Quevedo', response.data)
+        self.assertNotIn(b'Guns N Petals', response.data)
+
+    def test_venues_by_genre(self):
+        response = self.client.get('/venues?genre=Swing')
+
+        self.assertIn(b'The Musical Hop', response.data)
+        self.assertNotIn(b'The Dueling Pianos Bar', response.data)
+        self.assertEqual(self.client.get('/venues?genre=Jazz').data.count(b'<h3>'), 2)
+
+
+class BulkLoadTestCase(FyyurTestCase):
+    """This class represents the bulk loader test case"""
+
+    def seed(self):
+        # Starts the show counters
+        rebuild_show_counts()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.messages = []
+
+    def load(self, kind, name, text, chunk_size=2):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return load_file(kind, path, chunk_size=chunk_size, echo=self.messages.append)
+
+    def test_load_venues_artists_and_shows(self):
+        venues = self.load('venues', 'venues.csv', (
+            'name,city,state,address,genres,facebook_link\n'
+            'The Blue Room,Kansas City,MO,18th St,"Jazz,Blues",https://www.facebook.com/blueroom\n'
+            'Knuckleheads,Kansas City,MO,2715 Rochester,Rock n Roll,https://www.facebook.com/knuckleheads\n'
+            'Nowhere,Kansas City,ZZ,1 Main St,Jazz,https://www.facebook.com/nowhere\n'
+        ))
+        artists = self.load('artists', 'artists.ndjson', (
+            '{"name": "KC Quartet", "city": "Kansas City", "state": "MO", "genres": ["Jazz"], '
+            '"facebook_link": "https://www.facebook.com/kcq"}\n'
+            'not json\n'
+        ))
+        shows = self.load('shows', 'shows.ndjson', (
+            '{"venue": "The Blue Room", "artist": "KC Quartet", "start_time": "2036-05-01 20:00:00", "duration": 90}\n'
+            '{"venue": "Knuckleheads", "artist": "KC Quartet", "start_time": "2020-05-01 20:00:00", "duration": 90}\n'
+            '{"venue": "Nowhere", "artist": "KC Quartet", "start_time": "2036-05-02 20:00:00", "duration": 90}\n'
+            '{"venue": "Knuckleheads", "artist": "KC Quartet", "duration": 90}\n'
+        ))
+
+        self.assertEqual((venues['loaded'], venues['skipped']), (2, 1))
+        self.assertEqual((artists['loaded'], artists['skipped']), (1, 1))
+        self.assertEqual((shows['loaded'], shows['skipped']), (2, 2))
+        messages = [os.path.basename(message) for message in self.messages]
+        self.assertIn('venues.csv:4: state: Not a valid choice', messages)
+        self.assertIn('shows.ndjson:3: venue: no venues named Nowhere', messages)
+        self.assertIn('shows.ndjson:4: start_time: This field is required.', messages)
+
+        venue = Venue.query.filter_by(name='The Blue Room').one()
+        self.assertEqual(list(venue.genres), ['Blues', 'Jazz'])
+        show = Show.query.filter_by(venue_id=venue.id).one()
+        self.assertEqual(show.end_time - show.start_time, timedelta(minutes=90))
+
+        artist = Artist.query.filter_by(name='KC Quartet').one()
+        counts = ArtistShowCount.query.get(artist.id)
+        self.assertEqual((counts.upcoming_shows_count, counts.past_shows_count), (1, 1))
+
+
+class FragmentCacheTestCase(FyyurTestCase):
+    """This class represents the page fragment cache test case"""
+
+    def seed(self):
+        rebuild_show_counts()
+
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+        artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll'])
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        self.venue_id, self.artist_id = venue.id, artist.id
+
+        self.client.post('/shows/create', data={
+            'venue_id': self.venue_id, 'artist_id': self.artist_id, 'start_time': '2035-04-01 20:00:00',
+            'duration': 120
+        })
+
+    def edit_venue(self, name):
+        return self.client.post(f'/venues/{self.venue_id}/edit', data={
+            'name': name, 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+            'genres': ['Jazz', 'Blues'], 'facebook_link': 'https://www.facebook.com/TheMusicalHop'
+        })
+
+    def test_pages_are_rendered_once(self):
+        queries = []
+        thread = threading.get_ident()
+
+        def count(*args):
+            if threading.get_ident() == thread:
+                queries.append(1)
+
+        self.client.get(f'/venues/{self.venue_id}')
+        # As in a new request
+        db.session.remove()
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.client.get(f'/venues/{self.venue_id}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        self.assertIn(b'Guns N Petals', response.data)
+        # Only the venue itself is read
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+
+    def test_edits_render_the_affected_pages_again(self):
+        for path in (f'/venues/{self.venue_id}', f'/artists/{self.artist_id}', '/shows'):
+            self.assertIn(b'The Musical Hop', self.client.get(path).data)
+
+        response = self.edit_venue('The Musical Hopper')
+        self.assertEqual(response.status_code, 302)
+        for path in (f'/venues/{self.venue_id}', f'/artists/{self.artist_id}', '/shows'):
+            self.assertIn(b'The Musical Hopper', self.client.get(path).data)
+        self.assertEqual(list(Venue.query.get(self.venue_id).genres), ['Blues', 'Jazz'])
+
+    def test_new_shows_render_their_pages_again(self):
+        self.client.get(f'/artists/{self.artist_id}')
+        self.client.post('/shows/create', data={
+            'venue_id': self.venue_id, 'artist_id': self.artist_id, 'start_time': '2035-04-02 20:00:00',
+            'duration': 120
+        })
+
+        self.assertIn(b'2 Upcoming Shows', self.client.get(f'/artists/{self.artist_id}').data)
+
+    def test_invalid_edit(self):
+        response = self.edit_venue('')
+
+        self.assertIn(b'Please check the venue fields.', response.data)
+        self.assertEqual(Venue.query.get(self.venue_id).name, 'The Musical Hop')
+
+    def test_fragments_expire(self):
+        fragment_cache.put('fragment', 'cached', expires_at=100)
+
+        self.assertEqual(fragment_cache.get('fragment', now=99), 'cached')
+        self.assertIsNone(fragment_cache.get('fragment', now=100))
+
+
+class ShowCountTestCase(FyyurTestCase):
+    """This class represents the show counters test case"""
+
+    def seed(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA')
+        artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+        db.session.add_all([venue, artist])
+        # Two past shows and three upcoming ones, a day apart
+        self.now = datetime(2035, 4, 1, 12, tzinfo=timezone.utc)
+        for days in range(-2, 3):
+            start_time = self.now + timedelta(days=days, hours=1)
+            db.session.add(
+                Show(venue=venue, artist=artist, start_time=start_time, end_time=start_time + timedelta(hours=2))
+            )
+        db.session.commit()
+        self.venue_id, self.artist_id = venue.id, artist.id
+
+    def assertCounts(self, upcoming, past):
+        for counts in (VenueShowCount.query.get(self.venue_id), ArtistShowCount.query.get(self.artist_id)):
+            db.session.refresh(counts)
+            self.assertEqual((counts.upcoming_shows_count, counts.past_shows_count), (upcoming, past))
+
+    def test_rebuild(self):
+        rebuild_show_counts(self.now)
+        self.assertCounts(3, 2)
+        self.assertEqual(as_utc(ShowCountWatermark.query.get(1).aged_until), self.now)
+
+        # Counters that drifted are counted again
+        VenueShowCount.query.update({VenueShowCount.upcoming_shows_count: 7})
+        db.session.commit()
+        rebuild_show_counts(self.now + timedelta(days=1, hours=2))
+        self.assertCounts(1, 4)
+
+    def test_age_moves_started_shows_to_past(self):
+        rebuild_show_counts(self.now)
+
+        # The shows of today and tomorrow have started
+        age_show_counts(self.now + timedelta(days=1, hours=2))
+        self.assertCounts(1, 4)
+
+        # Nothing started since, and time does not go back
+        age_show_counts(self.now + timedelta(days=1, hours=2))
+        age_show_counts(self.now)
+        self.assertCounts(1, 4)
+
+    def test_age_without_watermark_rebuilds(self):
+        age_show_counts(self.now)
+
+        self.assertCounts(3, 2)
+
+    def test_new_shows_are_counted_by_watermark(self):
+        rebuild_show_counts(self.now)
+        other_artist = Artist(name='Matt Quevedo', city='New York', state='NY')
+        db.session.add(other_artist)
+        db.session.flush()
+
+        # One show before the watermark, already past, and one upcoming, for a new and a counted owner
+        shows = [
+            {'venue_id': self.venue_id, 'artist_id': other_artist.id, 'start_time': self.now - timedelta(hours=1)},
+            {'venue_id': self.venue_id, 'artist_id': other_artist.id, 'start_time': self.now + timedelta(hours=1)}
+        ]
+        count_new_shows(shows)
+        db.session.commit()
+        counts = ArtistShowCount.query.get(other_artist.id)
+        self.assertEqual((counts.upcoming_shows_count, counts.past_shows_count), (1, 1))
+        counts = VenueShowCount.query.get(self.venue_id)
+        self.assertEqual((counts.upcoming_shows_count, counts.past_shows_count), (4, 3))
+
+        count_new_shows(shows, removed=True)
+        db.session.commit()
+        self.assertCounts(3, 2)
+
+
+class VenuePurgeTestCase(FyyurTestCase):
+    """This class represents the venue deletion test case"""
+
+    # Purges run from the tests, in batches of 2 shows
+    config = dict(FyyurTestCase.config, VENUE_PURGE_IN_BACKGROUND=False, VENUE_PURGE_BATCH_SIZE=2)
+
+    def seed(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA')
+        artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+        db.session.add_all([venue, artist])
+        now = datetime.now(timezone.utc)
+        for days in range(-2, 3):
+            start_time = now + timedelta(days=days, hours=1)
+            db.session.add(
+                Show(venue=venue, artist=artist, start_time=start_time, end_time=start_time + timedelta(hours=2))
+            )
+        db.session.commit()
+        rebuild_show_counts()
+        self.venue_id, self.artist_id = venue.id, artist.id
+
+    def test_deleted_venue_is_hidden_right_away(self):
+        self.assertIn(b'3 Upcoming Shows', self.client.get(f'/artists/{self.artist_id}').data)
+        response = self.client.delete(f'/venues/{self.venue_id}')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['purge'], f'/venues/{self.venue_id}/purge')
+        self.assertEqual(self.client.get(f'/venues/{self.venue_id}').status_code, 404)
+        self.assertNotIn(b'The Musical Hop', self.client.get('/venues').data)
+        self.assertNotIn(b'The Musical Hop', self.client.post('/venues/search', data={'search_term': 'hop'}).data)
+        self.assertNotIn(b'The Musical Hop', self.client.get('/shows').data)
+        self.assertIn(b'0 Upcoming Shows', self.client.get(f'/artists/{self.artist_id}').data)
+        # Not purged yet
+        self.assertEqual(Show.query.count(), 5)
+        self.assertEqual(self.client.delete(f'/venues/{self.venue_id}').status_code, 404)
+
+    def test_purge_in_batches(self):
+        self.client.delete(f'/venues/{self.venue_id}')
+        purge_batch(2)
+        purge_batch(2)
+
+        status = self.client.get(f'/venues/{self.venue_id}/purge').get_json()
+        self.assertEqual((status['status'], status['shows_purged']), ('purging', 4))
+        self.assertEqual(Show.query.count(), 1)
+
+        purge_venues()
+        status = self.client.get(f'/venues/{self.venue_id}/purge').get_json()
+        self.assertEqual((status['status'], status['shows_purged']), ('done', 5))
+        self.assertIsNone(Venue.query.get(self.venue_id))
+        counts = ArtistShowCount.query.get(self.artist_id)
+        self.assertEqual((counts.upcoming_shows_count, counts.past_shows_count), (0, 0))
+        self.assertFalse(purge_batch(2))
+
+    def test_no_shows_at_deleted_venues(self):
+        self.client.delete(f'/venues/{self.venue_id}')
+        response = self.client.post('/shows/create', data={
+            'venue_id': self.venue_id, 'artist_id': self.artist_id, 'start_time': '2035-04-01 20:00:00',
+            'duration': 120
+        })
+
+        self.assertIn(b'The venue was deleted.', response.data)
+        self.assertEqual(Show.query.count(), 5)
+
+    def test_missing_purge(self):
+        self.assertEqual(self.client.get(f'/venues/{self.venue_id}/purge').status_code, 404)
+
+
+class DatetimeFilterTestCase(unittest.TestCase):
+    """This class represents the datetime template filter test case"""
+
+    def test_datetimes_and_strings(self):
+        start_time = datetime(2035, 4, 1, 20, tzinfo=timezone.utc)
+
+        self.assertEqual(format_datetime(start_time, 'full'), 'Sunday April, 1, 2035 at 8:00PM')
+        self.assertEqual(format_datetime(start_time.isoformat(), 'full'), 'Sunday April, 1, 2035 at 8:00PM')
+        # Naive times are in UTC, other strings are read by dateutil
+        self.assertEqual(format_datetime('2035-04-01T20:00:00', 'medium'), 'Sun 04, 01, 2035 8:00PM')
+        self.assertEqual(format_datetime('April 1 2035 8pm', 'medium'), 'Sun 04, 01, 2035 8:00PM')
+
+    def test_babel_format_names(self):
+        start_time = datetime(2035, 4, 1, 20, tzinfo=timezone.utc)
+
+        # Babel writes a narrow no-break space before the AM/PM marker of the locale
+        self.assertEqual(format_datetime(start_time, 'short', 'en_US'), '4/1/35, 8:00\u202fPM')
+        self.assertEqual(format_datetime(start_time, 'long', 'en_US'), 'April 1, 2035, 8:00:00\u202fPM UTC')
+        self.assertEqual(format_datetime(start_time, 'short', 'de_DE'), '01.04.35, 20:00')
+        for format in ('short', 'long'):
+            self.assertEqual(
+                format_datetime(start_time, format, 'fr_FR'),
+                babel.dates.format_datetime(start_time, format, tzinfo=timezone.utc, locale='fr_FR')
+            )
+
+    def test_time_zones_are_kept_apart(self):
+        start_time = datetime(2035, 4, 1, 20, tzinfo=timezone.utc)
+        paris = start_time.astimezone(timezone(timedelta(hours=2)))
+
+        self.assertEqual(format_datetime(start_time, 'h:mma'), '8:00PM')
+        # Equal to start_time, but written in its own time zone
+        self.assertEqual(format_datetime(paris, 'h:mma'), '10:00PM')
+
+
+class SuggestIndexTestCase(unittest.TestCase):
+    """This class represents the typeahead suggestion index test case"""
+
+    def setUp(self):
+        self.venues = [
+            (1, 'The Musical Hop', 'San Francisco', 'CA'),
+            (2, 'Park Square Live Music & Coffee', 'San Francisco', 'CA'),
+            (3, 'Café Jazz Club', 'New York', 'NY')
+        ]
+        self.artists = [(1, 'Guns N Petals', 'San Francisco', 'CA'), (2, 'Jazz Hall', 'Oakland', 'CA')]
+        self.index = SuggestIndex(lambda: (self.venues, self.artists))
+        self.index.refresh()
+
+    def names(self, query, limit=10, index=None):
+        return [suggestion['name'] for suggestion in (index or self.index).search(query, limit)]
+
+    def test_names_starting_with_the_query_come_first_then_the_shortest(self):
+        self.assertEqual(self.names('mus'), ['The Musical Hop', 'Park Square Live Music & Coffee'])
+        self.assertEqual(self.names('the'), ['The Musical Hop'])
+        self.assertEqual(self.names('ja'), ['Jazz Hall', 'Café Jazz Club'])
+        self.assertEqual(self.index.search('san')[0], {
+            'type': 'area', 'name': 'San Francisco, CA', 'city': 'San Francisco', 'state': 'CA'
+        })
+
+    def test_every_word_of_the_query_must_match(self):
+        self.assertEqual(self.names('jazz cl'), ['Café Jazz Club'])
+        self.assertEqual(self.names('cafe jazz'), ['Café Jazz Club'])
+        self.assertEqual(self.names('jazz zz'), [])
+        self.assertEqual(self.names(' & '), [])
+
+    def test_put_and_remove(self):
+        self.index.put('venue', 4, 'Musical Corner', 'Oakland', 'CA')
+        self.assertEqual(self.names('mus', 1), ['Musical Corner'])
+
+        # Renaming replaces the previous name
+        self.index.put('venue', 4, 'The Corner', 'Oakland', 'CA')
+        self.assertEqual(self.names('cor'), ['The Corner'])
+        self.assertEqual(self.names('musical'), ['The Musical Hop'])
+
+        self.index.remove('venue', 4)
+        self.index.remove('venue', 4)
+        self.assertEqual(self.names('cor'), [])
+
+    def test_areas_are_kept_while_they_have_names(self):
+        self.index.remove('artist', 2)
+        self.assertEqual(self.names('oak'), [])
+
+        self.index.put('venue', 4, 'The Corner', 'Oakland', 'CA')
+        self.index.put('artist', 3, 'Corner Band', 'Oakland', 'CA')
+        self.index.remove('venue', 4)
+        self.assertEqual(self.names('oak'), ['Oakland, CA'])
+        self.index.remove('artist', 3)
+        self.assertEqual(self.names('oak'), [])
+
+    def test_changes_made_while_reloading_are_replayed(self):
+        def load_during_changes():
+            # The rows were read before these changes were committed
+            rows = list(self.venues), list(self.artists)
+            self.index.put('venue', 4, 'The Corner', 'Oakland', 'CA')
+            self.index.remove('venue', 1)
+            return rows
+
+        self.index.loader = load_during_changes
+        self.index.refresh()
+
+        self.assertEqual(self.names('cor'), ['The Corner'])
+        self.assertEqual(self.names('hop'), [])
+
+    def test_failed_load_keeps_the_index(self):
+        def fail():
+            raise RuntimeError('database unavailable')
+
+        index = SuggestIndex(fail)
+        with self.assertRaises(RuntimeError):
+            index.refresh()
+        self.assertFalse(index.ready)
+
+        self.index.loader = fail
+        self.index.refresh_in_background()
+        self.assertEqual(self.names('mus'), ['The Musical Hop', 'Park Square Live Music & Coffee'])
+
+    def test_common_prefixes_rank_the_shortest_names(self):
+        # More words start with "m" than are looked at, and the alphabetically first ones have long names
+        venues = [(i, f'Maa Hall Number {i} With A Long Name', 'Oakland', 'CA') for i in range(10)]
+        venues += [(10, 'Mzz', 'Oakland', 'CA'), (11, 'The Mxx Bar', 'Oakland', 'CA')]
+        index = SuggestIndex(lambda: (venues, []), scan_max=5)
+        index.refresh()
+        exact = SuggestIndex(lambda: (venues, []), scan_max=len(venues) * 10)
+        exact.refresh()
+
+        self.assertEqual(self.names('m', 2, index), ['Mzz', 'Maa Hall Number 0 With A Long Name'])
+        self.assertEqual(self.names('m', 2, index), self.names('m', 2, exact))
+        self.assertEqual(self.names('m bar', 3, index), ['The Mxx Bar'])
+
+
+def tearDownModule():
+    os.unlink(database.name)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ from sqlalchemy import Column, String, Integer, create_engine
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+from db_core import configure_db
+
 database_name = "trivia"
 database_path = "postgres://{}/{}".format('localhost:5432', database_name)
 
@@ -11,13 +13,11 @@ db = SQLAlchemy()
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    the pool is configured with the DB_* environment variables (see db_core), tables come from trivia.psql
+    and are only created when DB_CREATE_ALL is set
 '''
 def setup_db(app, database_path=database_path):
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_path
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.app = app
-    db.init_app(app)
-    db.create_all()
+    configure_db(app, db, database_path)
 
 '''
 Question
@@ -0,0 +1,82 @@
+"""
+Measures the per-request cost of verifying a token with each key source, with and without the verified token cache
+
+Run from the backend folder with `python benchmarks/bench_auth.py`. A config.py must exist in src.
+No access to Auth0 is needed: the token is signed with a key generated on the fly and the remote key set
+is served by a local HTTP server.
+"""
+import json
+import os
+import sys
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import auth
+from auth_core import JWKSCache, StaticKeySource, TokenVerifier, VerifiedTokenCache
+from auth_core.testing import LocalSigningKey
+from config import ALGORITHMS, API_AUDIENCE, AUTH0_DOMAIN
+
+REQUESTS = 500
+
+
+class UncachedJWKS:
+    """How verify_decode_jwt used to work: fetch the key set on every request"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def get_key(self, kid):
+        with urlopen(self.url) as jsonurl:
+            jwks = json.loads(jsonurl.read())
+        return next((key for key in jwks['keys'] if key['kid'] == kid), None)
+
+
+def serve_jwks(jwks):
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/.well-known/jwks.json'
+
+
+def main():
+    key = LocalSigningKey(kid='bench')
+    token = key.mint(
+        ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks'],
+        iss=f'https://{AUTH0_DOMAIN}/', aud=API_AUDIENCE, sub='bench|1'
+    )
+    server, url = serve_jwks(key.jwks)
+
+    scenarios = (
+        ('jwks fetched per request', UncachedJWKS(url), 0),
+        ('cached jwks', JWKSCache(url), 0),
+        ('static keys', StaticKeySource(key.jwks), 0),
+        ('cached jwks + token cache', JWKSCache(url), 1024),
+    )
+    for label, key_source, cache_size in scenarios:
+        auth.verifier = TokenVerifier(
+            key_source, algorithms=ALGORITHMS, audience=API_AUDIENCE, issuer=f'https://{AUTH0_DOMAIN}/',
+            token_cache=VerifiedTokenCache(cache_size)
+        )
+        seconds = timeit.timeit(lambda: auth.verify_decode_jwt(token), number=REQUESTS)
+        print(f'{label:>26}: {seconds / REQUESTS * 1e6:9.1f} us/request  {auth.verifier.token_cache.stats()}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
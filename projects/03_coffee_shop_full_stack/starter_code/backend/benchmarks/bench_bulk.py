@@ -0,0 +1,58 @@
+"""
+Compares writing 10k drinks one per row (Drink.insert(), one commit each) with Drink.bulk_upsert()
+
+Run from the backend folder with `python benchmarks/bench_bulk.py <database url>`, e.g.
+`python benchmarks/bench_bulk.py postgresql://postgres@localhost/coffeeshop_bench`.
+Use a scratch Postgres database: the drinks table is created if needed and emptied before each run.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask
+
+from models import setup_db, db, Drink
+
+DRINKS = 10000
+
+
+def make_drinks(prefix):
+    recipe = [{'name': 'milk', 'color': 'grey', 'parts': 1}]
+    return [{'title': f'{prefix} {i}', 'recipe': recipe} for i in range(DRINKS)]
+
+
+def empty_table():
+    db.session.execute('TRUNCATE drinks RESTART IDENTITY')
+    db.session.commit()
+
+
+def measure(label, write, setup=None):
+    empty_table()
+    if setup:
+        setup()
+    started = time.perf_counter()
+    write()
+    seconds = time.perf_counter() - started
+    print(f'{label:>22}: {seconds:8.2f} s  {DRINKS / seconds:10,.0f} drinks/s')
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+
+    app = Flask(__name__)
+    setup_db(app, sys.argv[1])
+    with app.app_context():
+        db.create_all()
+
+        measure('per-row insert()', lambda: [Drink(**drink).insert() for drink in make_drinks('row')])
+        measure('bulk_upsert() insert', lambda: Drink.bulk_upsert(make_drinks('bulk')))
+        measure('bulk_upsert() update', lambda: Drink.bulk_upsert(make_drinks('bulk')),
+                setup=lambda: Drink.bulk_upsert(make_drinks('bulk')))
+        empty_table()
+
+
+if __name__ == '__main__':
+    main()
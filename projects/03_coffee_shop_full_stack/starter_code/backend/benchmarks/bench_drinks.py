@@ -0,0 +1,61 @@
+"""
+Measures how fast a list of 10k drinks is serialized by Drink.short() and Drink.long()
+
+Run from the backend folder with `python benchmarks/bench_drinks.py`. A config.py must exist in src.
+The drinks are built in memory, no database is needed.
+
+"before" re-implements short()/long() from when the recipe was stored as a JSON string and parsed on every call
+(twice in short(), once only to print it). The recipe is now a JSONB column, decoded once by the database driver
+when the row is loaded, so serializing it needs no parsing at all.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from models import Drink
+
+DRINKS = 10000
+ROUNDS = 5
+RECIPE = [{'name': 'milk', 'color': 'grey', 'parts': 1}, {'name': 'espresso', 'color': 'brown', 'parts': 2}]
+
+
+def short_before(drink):
+    print(json.loads(drink.recipe))
+    short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(drink.recipe)]
+    return {
+        'id': drink.id,
+        'title': drink.title,
+        'recipe': short_recipe
+    }
+
+
+def long_before(drink):
+    return {
+        'id': drink.id,
+        'title': drink.title,
+        'recipe': json.loads(drink.recipe)
+    }
+
+
+def measure(label, serialize, recipe):
+    drinks = [Drink(id=i, title=f'Drink {i}', recipe=recipe) for i in range(DRINKS)]
+    # short_before prints every recipe, keep it out of the results but not out of the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = timeit.timeit(lambda: [serialize(drink) for drink in drinks], number=ROUNDS)
+    print(f'{label:>16}: {DRINKS * ROUNDS / seconds:12,.0f} drinks/s')
+
+
+def main():
+    measure('short() before', short_before, json.dumps(RECIPE))
+    measure('short()', Drink.short, RECIPE)
+    measure('long() before', long_before, json.dumps(RECIPE))
+    measure('long()', Drink.long, RECIPE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Measures how many drink payloads are validated per second, valid and invalid
+
+Run from the backend folder with `python benchmarks/bench_validation.py`. A config.py must exist in src.
+No database is needed.
+
+"before" re-implements validate_drink() from before DRINK_SCHEMA: it re-encoded the recipe to JSON only to measure
+its length, looked every key up in a loop and stopped at the first error. DRINK_SCHEMA is compiled once into plain
+checking functions and reports every invalid field.
+"""
+import json
+import os
+import sys
+import timeit
+
+from werkzeug.exceptions import UnprocessableEntity
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from models import DRINK_SCHEMA, DRINK_TITLE_MAX
+from validation import ValidationError
+
+PAYLOADS = 10000
+ROUNDS = 5
+DRINK_RECIPE_MAX = 180
+VALID = {
+    'title': 'Flat white',
+    'recipe': [{'name': 'milk', 'color': 'grey', 'parts': 1}, {'name': 'espresso', 'color': 'brown', 'parts': 2}]
+}
+INVALID = {
+    'title': 'Flat white',
+    'recipe': [{'name': 'milk', 'color': 'grey', 'parts': 1}, {'name': 'espresso', 'parts': 2}]
+}
+
+
+def validate_before(title=None, recipe=None):
+    drink_data = {'title': title.strip()}
+
+    drink_title_length = len(drink_data['title'])
+    if drink_title_length == 0 or drink_title_length > DRINK_TITLE_MAX:
+        raise UnprocessableEntity(description="Please check drink title length")
+
+    drink_data['recipe'] = recipe
+    drink_recipe_length = len(json.dumps(drink_data['recipe']))
+    if 0 == drink_recipe_length or drink_recipe_length > DRINK_RECIPE_MAX:
+        raise UnprocessableEntity(description="Please check field lengths")
+
+    for recipe in drink_data['recipe']:
+        if 'name' not in recipe or \
+                'color' not in recipe or \
+                'parts' not in recipe:
+            raise UnprocessableEntity(description="A recipe is missing a property")
+
+    return drink_data
+
+
+def run_before(payload):
+    try:
+        validate_before(title=payload['title'], recipe=payload['recipe'])
+    except UnprocessableEntity:
+        pass
+
+
+def run_schema(payload):
+    try:
+        DRINK_SCHEMA.validate(payload)
+    except ValidationError:
+        pass
+
+
+def measure(label, validate, payload):
+    payloads = [payload] * PAYLOADS
+    seconds = timeit.timeit(lambda: [validate(p) for p in payloads], number=ROUNDS)
+    print(f'{label:>16}: {PAYLOADS * ROUNDS / seconds:12,.0f} drinks/s')
+
+
+def main():
+    measure('valid before', run_before, VALID)
+    measure('valid', run_schema, VALID)
+    measure('invalid before', run_before, INVALID)
+    measure('invalid', run_schema, INVALID)
+
+
+if __name__ == '__main__':
+    main()
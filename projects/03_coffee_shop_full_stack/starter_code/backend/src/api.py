@@ -1,12 +1,18 @@
 import sys
-from flask import Flask, request, jsonify
-from werkzeug.exceptions import HTTPException, BadRequest, UnprocessableEntity, NotFound
+import zlib
+from flask import Flask, Response, request, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException, BadRequest, UnprocessableEntity, NotFound, ServiceUnavailable
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 import json
 from flask_cors import CORS
 
-from errors import DrinkNotFound
-from models import setup_db, db, update, Drink, DRINK_RECIPE_MAX, DRINK_TITLE_MAX
-from auth import requires_auth
+from errors import DrinkNotFound, DrinkInvalid
+from models import setup_db, db, update, data_version, Drink, DRINK_FIELDS, DRINK_SCHEMA
+from auth import requires_auth, permission_table
+from db_core import pool_status
+from response_cache import ResponseCache
+from validation import ValidationError
 
 
 def create_app():
@@ -25,82 +31,140 @@ def create_app():
         response.headers.add('Access-Control-Allow-Methods', 'GET, POST, DELETE, PATCH')
         return response
 
+    # The menu changes rarely, so drink listings are served from memory until a drink is written
+    drinks_cache = ResponseCache(data_version, ttl=app.config.get('DRINKS_CACHE_TTL', 5))
+
+    def get_listing_args():
+        """
+        Parses the `after`, `limit`, `fields` and `ingredient` query parameters of a drink listing
+        """
+        try:
+            after = request.args.get('after', None)
+            after = int(after) if after is not None else None
+            limit = request.args.get('limit', None)
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            raise BadRequest(description='after and limit must be integers')
+
+        if limit is not None and not 0 < limit <= app.config.get('DRINKS_PAGE_MAX', 100):
+            raise BadRequest(description=f'limit must be between 1 and {app.config.get("DRINKS_PAGE_MAX", 100)}')
+
+        fields = request.args.get('fields', None)
+        if fields is None:
+            fields = DRINK_FIELDS
+        else:
+            fields = tuple(field for field in DRINK_FIELDS if field in fields.split(','))
+            if not fields:
+                raise BadRequest(description=f'fields must be some of {", ".join(DRINK_FIELDS)}')
+
+        ingredient = request.args.get('ingredient', None)
+
+        return after, limit, fields, ingredient
+
+    def drinks_response(representation, public):
+        """
+        Lists the drinks in the given representation ('short' or 'long'), with an ETag so
+        clients can revalidate their copy and get a 304 when the menu has not changed
+
+        Without a `limit` every drink is listed. With one, the listing is paginated by id and `next_after`
+        is the `after` value of the next page. `fields` projects the drinks to some of their fields, and
+        `ingredient` only lists the drinks made with an ingredient of that name.
+        """
+        after, limit, fields, ingredient = get_listing_args()
+
+        def build():
+            drinks, next_after = Drink.page(after=after, limit=limit, fields=fields, ingredient=ingredient)
+            return jsonify({
+                'success': True,
+                'drinks': [getattr(drink, representation)(fields) for drink in drinks],
+                'next_after': next_after
+            }).get_data()
+
+        cached = drinks_cache.get((representation, after, limit, fields, ingredient), build)
+
+        response = app.response_class(cached.body, mimetype='application/json')
+        response.set_etag(cached.etag)
+        if public:
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
     # ROUTES
     @app.route('/drinks')
     def get_drinks():
-        response = []
         try:
-            drinks = Drink.query.order_by('id').all()
-            response = {
-                'success': True,
-                'drinks': [drink.short() for drink in drinks]
-            }
+            return drinks_response('short', public=True)
+        except BadRequest:
+            raise
         except Exception:
             print(sys.exc_info())
             raise BadRequest
 
-        return jsonify(response)
-
     @app.route('/drinks-detail')
     @requires_auth(permission='get:drinks-detail')
     def get_drink_detail():
-        response = []
         try:
-            drinks = Drink.query.order_by('id').all()
-            response = {
-                'success': True,
-                'drinks': [drink.long() for drink in drinks]
-            }
+            return drinks_response('long', public=False)
+        except BadRequest:
+            raise
         except Exception:
             print(sys.exc_info())
             raise BadRequest
 
-        return jsonify(response)
-
-    def validate_drink(title=None, recipe=None, updating=None):
-        check_title = True if not updating and title is not None else False
-        check_recipe = True if not updating and recipe is not None else False
-
-        drink_data = {}
-
-        if check_title:
-            drink_data = {
-                'title': title.strip()
-            }
-
-            drink_title_length = len(drink_data['title'])
-            if drink_title_length == 0 or drink_title_length > DRINK_TITLE_MAX:
-                raise UnprocessableEntity(description="Please check drink title length")
-
-        if check_recipe:
-            drink_data['recipe'] = recipe
-
-            drink_recipe_length = len(json.dumps(drink_data['recipe']))
-
-            if 0 == drink_recipe_length or drink_recipe_length > DRINK_RECIPE_MAX:
-                raise UnprocessableEntity(description="Please check field lengths")
-
-            for recipe in drink_data['recipe']:
-                if 'name' not in recipe or \
-                        'color' not in recipe or \
-                        'parts' not in recipe:
-                    raise UnprocessableEntity(description="A recipe is missing a property")
-
-            drink_data['recipe'] = json.dumps(drink_data['recipe']);
+    def export_chunks(rows, rows_per_chunk=1000):
+        """
+        Serializes drinks as NDJSON, one chunk of text per `rows_per_chunk` drinks
+        """
+        lines = []
+        for drink_id, title, recipe in rows:
+            # Postgres renders the recipe as JSON text, so it is spliced in as is instead of being parsed and dumped
+            lines.append(f'{{"id": {drink_id}, "title": {json.dumps(title)}, "recipe": {recipe}}}\n')
+            if len(lines) == rows_per_chunk:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    def gzip_chunks(chunks):
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode())
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @app.route('/drinks/export')
+    @requires_auth(permission='get:drinks-detail')
+    def export_drinks():
+        """
+        Streams every drink as NDJSON, gzip-compressed on the fly if the client accepts it
+        """
+        chunks = export_chunks(Drink.export_rows())
+        response = Response(mimetype='application/x-ndjson')
+        if request.accept_encodings['gzip']:
+            chunks = gzip_chunks(chunks)
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.response = stream_with_context(chunks)
+        return response
 
-        return drink_data
+    def validate_drink(drink_data, partial=False):
+        """
+        Returns the cleaned drink, or raises DrinkInvalid listing every invalid field
+        """
+        try:
+            return DRINK_SCHEMA.validate(drink_data, partial=partial)
+        except ValidationError as e:
+            raise DrinkInvalid(e.errors)
 
     @app.route('/drinks', methods=['POST'])
     @requires_auth(permission='post:drinks')
     def create_drink():
         response = ''
         try:
-            drink_data = {
-                'title': request.get_json()['title'],
-                'recipe': request.get_json()['recipe']
-            }
-
-            drink_data = validate_drink(**drink_data)
+            drink_data = validate_drink(request.get_json())
 
             drink = Drink(**drink_data)
             drink.insert()
@@ -116,6 +180,77 @@ def create_app():
 
         return jsonify(response)
 
+    def get_bulk_items():
+        """
+        Yields the drinks of a bulk request, sent either as a JSON array or as NDJSON (one drink per line).
+        A line of NDJSON that is not valid JSON is yielded as None.
+        """
+        if request.mimetype == 'application/x-ndjson':
+            for line in request.stream:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+        else:
+            items = request.get_json()
+            if not isinstance(items, list):
+                raise BadRequest(description='Expected a JSON array of drinks')
+            yield from items
+
+    @app.route('/drinks/bulk', methods=['POST'])
+    @requires_auth(all_of=['post:drinks', 'patch:drinks'])
+    def bulk_upsert_drinks():
+        """
+        Creates many drinks at once, or updates the recipe of those whose title already exists.
+        Every drink is validated first and the valid ones are written in a single transaction.
+        """
+        bulk_max = app.config.get('DRINKS_BULK_MAX', 10000)
+        results = []
+        valid = {}
+        for index, item in enumerate(get_bulk_items()):
+            if index >= bulk_max:
+                raise UnprocessableEntity(description=f'At most {bulk_max} drinks can be sent at once')
+
+            result = {'index': index, 'success': False}
+            results.append(result)
+            if item is None:
+                result['description'] = 'Not a valid JSON drink'
+                continue
+            try:
+                drink_data = validate_drink(item)
+            except DrinkInvalid as e:
+                result['description'] = e.description
+                result['errors'] = e.errors
+                continue
+
+            if drink_data['title'] in valid:
+                result['description'] = 'Duplicate title in this request'
+                continue
+
+            result['title'] = drink_data['title']
+            valid[drink_data['title']] = drink_data
+
+        try:
+            written = Drink.bulk_upsert(list(valid.values()))
+        except Exception:
+            print(sys.exc_info())
+            raise BadRequest
+
+        for result in results:
+            if 'title' in result:
+                result['id'], result['created'] = written[result['title']]
+                result['success'] = True
+
+        return jsonify({
+            'success': True,
+            'created': sum(1 for result in results if result.get('created')),
+            'updated': sum(1 for result in results if result['success'] and not result['created']),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
+        })
+
     @app.route('/drinks/<int:id>', methods=['PATCH'])
     @requires_auth(permission='patch:drinks')
     def patch_drink(id):
@@ -125,12 +260,7 @@ def create_app():
             if not drink:
                 raise DrinkNotFound
 
-            drink_data = {
-                'title': request.get_json()['title'] if 'title' in request.get_json() else None,
-                'recipe': request.get_json()['recipe'] if 'recipe' in request.get_json() else None
-            }
-
-            drink_data = validate_drink(**drink_data)
+            drink_data = validate_drink(request.get_json(), partial=True)
 
             for prop, val in drink_data.items():
                 setattr(drink, prop, val)
@@ -171,6 +301,22 @@ def create_app():
 
         return jsonify(response)
 
+    @app.route('/health')
+    def health():
+        """
+        Checks the database answers, and reports the connections held by this process
+        """
+        try:
+            db.session.execute(text('SELECT 1'))
+        except SQLAlchemyError:
+            print(sys.exc_info())
+            raise ServiceUnavailable(description='The database is unavailable')
+
+        return jsonify({
+            'success': True,
+            'pool': pool_status(db)
+        })
+
     ## Error Handling
     @app.errorhandler(HTTPException)
     def handle_bad_request(e):
@@ -184,6 +330,17 @@ def create_app():
         if hasattr(e, 'message'):
             response_body['message'] = e.message
 
+        if hasattr(e, 'errors'):
+            response_body['errors'] = e.errors
+
         return jsonify(response_body), code
 
+    ## CLI
+    @app.cli.command('permissions')
+    def print_permissions():
+        """
+        Prints the permissions required by each route
+        """
+        print(json.dumps(permission_table(), indent=2))
+
     return app
@@ -1,97 +1,48 @@
-import json
-from flask import request
-from functools import wraps
-from jose import jwt
-from urllib.request import urlopen
-
-from werkzeug.exceptions import Unauthorized
+from auth_core import (
+    JWKSCache, FileKeySource, TokenVerifier, VerifiedTokenCache, get_token_auth_header, check_permissions,
+    permission_table
+)
 
+import config
 from config import AUTH0_DOMAIN, ALGORITHMS, API_AUDIENCE
 
-from errors import AuthHeaderMissing, AuthHeaderInvalid, PermissionsNotFound, TokenExpired
-
 # Much of the following is from BasicFlaskAuth
 
-# Auth Header
-def get_token_auth_header():
+
+def get_key_source():
     """
-    Obtains the access token from the authorization header
+    Verification keys come from AUTH_KEY_FILE (a local PEM or JWKS file) if set, otherwise from the
+    Auth0 key set, which is fetched once and cached by every request handled by this process
     """
-    auth = request.headers.get('Authorization', None)
-    if not auth:
-        raise AuthHeaderMissing
-
-    parts = auth.split()
-    if parts[0].lower() != 'bearer':
-        raise AuthHeaderInvalid
+    key_file = getattr(config, 'AUTH_KEY_FILE', None)
+    if key_file:
+        return FileKeySource(key_file)
 
-    elif len(parts) == 1:
-        raise AuthHeaderInvalid(description='Token not found')
+    return JWKSCache(
+        getattr(config, 'JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'),
+        ttl=getattr(config, 'JWKS_CACHE_TTL', 600),
+        min_refresh_interval=getattr(config, 'JWKS_MIN_REFRESH_INTERVAL', 30),
+        timeout=getattr(config, 'JWKS_FETCH_TIMEOUT', 5)
+    )
 
-    elif len(parts) > 2:
-        raise AuthHeaderInvalid(description='Authorization header must be bearer token.')
 
-    token = parts[1]
-    return token
-
-
-def check_permissions(permission, payload):
-    if 'permissions' not in payload:
-        raise PermissionsNotFound
-
-    if permission not in payload['permissions']:
-        raise Unauthorized(description='Permission not found.')
-    return True
+verifier = TokenVerifier(
+    get_key_source(),
+    algorithms=ALGORITHMS,
+    audience=API_AUDIENCE,
+    issuer=f'https://{AUTH0_DOMAIN}/',
+    # Tokens that already passed verification, so RSA signatures are checked once per token rather than per request
+    token_cache=VerifiedTokenCache(getattr(config, 'TOKEN_CACHE_SIZE', 1024))
+)
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
-    unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
-    if 'kid' not in unverified_header:
-        raise AuthHeaderInvalid(description='Authorization malformed.')
-
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
-    if rsa_key:
-        try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer=f'https://{AUTH0_DOMAIN}/'
-            )
+    return verifier.verify(token)
 
-            return payload
 
-        except jwt.ExpiredSignatureError:
-            raise TokenExpired
-
-        except jwt.JWTClaimsError:
-            raise AuthHeaderInvalid(description='Incorrect claims. Please, check the audience and issuer.')
-        except Exception:
-            raise AuthHeaderInvalid(description='Unable to parse authentication token.')
-    raise AuthHeaderInvalid(description='Unable to find the appropriate key.')
-
-
-def requires_auth(permission=''):
-    def requires_auth_decorator(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            return f(*args, **kwargs)
-
-        return wrapper
-
-    return requires_auth_decorator
+def requires_auth(permission='', all_of=(), any_of=()):
+    """
+    Requires a valid token granting `permission` and every permission in `all_of`,
+    plus at least one of `any_of` if given
+    """
+    return verifier.requires_auth(permission, all_of=all_of, any_of=any_of)
@@ -1,26 +1,15 @@
-from werkzeug.exceptions import BadRequest, Unauthorized, NotFound
-
-
-class TokenExpired(BadRequest):
-    message = 'token_expired'
-    description = 'Token has expired'
-
-
-class PermissionsNotFound(BadRequest):
-    message = 'no_permissions'
-    description = 'Permissions not included in JWT.'
-
-
-class AuthHeaderMissing(Unauthorized):
-    message = 'authorization_header_missing'
-    description = 'Authorization header is expected.'
-
-
-class AuthHeaderInvalid(BadRequest):
-    message = 'invalid_header'
-    description = 'Authorization header must start with "Bearer".'
+from werkzeug.exceptions import NotFound, UnprocessableEntity
 
 
 class DrinkNotFound(NotFound):
     message = 'not_found'
     description = 'Drink not found'
+
+
+class DrinkInvalid(UnprocessableEntity):
+    message = 'invalid_drink'
+    description = 'Please check the drink fields'
+
+    def __init__(self, errors, description=None):
+        super().__init__(description=description)
+        self.errors = errors
@@ -0,0 +1,36 @@
+"""Store drink recipes as JSONB with a GIN index.
+
+Revision ID: 3c5e1f0a9b27
+Revises: 8ff56803bc3a
+Create Date: 2026-10-18 10:12:41.204318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e1f0a9b27'
+down_revision = '8ff56803bc3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('drinks', 'recipe',
+                    existing_type=sa.String(length=180),
+                    type_=postgresql.JSONB(astext_type=sa.Text()),
+                    existing_nullable=False,
+                    postgresql_using='recipe::jsonb')
+    op.create_index('ix_drinks_recipe', 'drinks', ['recipe'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'recipe': 'jsonb_path_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_drinks_recipe', table_name='drinks')
+    op.alter_column('drinks', 'recipe',
+                    existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                    type_=sa.String(length=180),
+                    existing_nullable=False,
+                    postgresql_using='recipe::text')
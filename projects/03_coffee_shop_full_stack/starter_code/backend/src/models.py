@@ -1,21 +1,43 @@
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, String, Integer, Text, Index, cast, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import load_only
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import json
+import threading
+
+from db_core import configure_db
+
+import validation
 
 db = SQLAlchemy()
 
 
+class DataVersion:
+    """
+    A counter bumped after every committed write, so cached reads can tell they are outdated
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+
+
+data_version = DataVersion()
+
+
 def setup_db(app, database_path=''):
     """
     Binds a flask application and a SQLAlchemy service
+    The connection pool is configured with the DB_* settings of config.py, tables are managed with migrations
     """
     app.config.from_object('config')
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_path \
-        if len(database_path) > 0 else app.config["SQLALCHEMY_DATABASE_URI"]
+    configure_db(app, db, database_path)
     migrate = Migrate(app, db)
-    db.app = app
-    db.init_app(app)
 
 
 def update():
@@ -28,6 +50,7 @@ def update():
         drink.update()
     """
     db.session.commit()
+    data_version.bump()
 
 
 class Model:
@@ -42,6 +65,7 @@ class Model:
         """
         db.session.add(self)
         db.session.commit()
+        data_version.bump()
 
     def delete(self):
         """
@@ -53,6 +77,7 @@ class Model:
         """
         db.session.delete(self)
         db.session.commit()
+        data_version.bump()
 
     def format(self):
         return {}
@@ -62,7 +87,25 @@ class Model:
 
 
 DRINK_TITLE_MAX = 80
-DRINK_RECIPE_MAX = 180
+# Most ingredients in a recipe, as many as the frontend lets you add
+DRINK_RECIPE_ITEMS_MAX = 5
+DRINK_INGREDIENT_NAME_MAX = 40
+DRINK_INGREDIENT_COLOR_MAX = 40
+DRINK_INGREDIENT_PARTS_MAX = 100
+
+# Compiled once, used to validate drinks sent to POST /drinks, PATCH /drinks/<id> and POST /drinks/bulk
+DRINK_SCHEMA = validation.Object({
+    'title': validation.String(max_length=DRINK_TITLE_MAX),
+    'recipe': validation.List(validation.Object({
+        'name': validation.String(max_length=DRINK_INGREDIENT_NAME_MAX),
+        'color': validation.String(max_length=DRINK_INGREDIENT_COLOR_MAX),
+        'parts': validation.Number(minimum=1, maximum=DRINK_INGREDIENT_PARTS_MAX)
+    }), max_items=DRINK_RECIPE_ITEMS_MAX)
+})
+# Fields a drink listing can be projected to
+DRINK_FIELDS = ('id', 'title', 'recipe')
+# Rows per INSERT statement when writing drinks in bulk
+DRINK_BULK_BATCH_SIZE = 1000
 
 class Drink(Model, db.Model):
     """
@@ -73,32 +116,109 @@ class Drink(Model, db.Model):
     id = Column(Integer(), primary_key=True)
     # String Title
     title = Column(String(DRINK_TITLE_MAX), unique=True)
-    # the ingredients blob - this stores a lazy json blob
+    # the ingredients, stored as JSONB
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
-    recipe = Column(String(DRINK_RECIPE_MAX), nullable=False)
+    recipe = Column(JSONB, nullable=False)
+
+    __table_args__ = (
+        # Answers recipe containment (@>) queries, e.g. the drinks made with a given ingredient
+        Index('ix_drinks_recipe', 'recipe', postgresql_using='gin', postgresql_ops={'recipe': 'jsonb_path_ops'}),
+    )
+
+    @classmethod
+    def page(cls, after=None, limit=None, fields=DRINK_FIELDS, ingredient=None):
+        """
+        Returns the drinks ordered by id, starting after the drink with id `after`, and the id to pass
+        as `after` to get the next page (None on the last page). Only the columns in `fields` are loaded.
+        With `ingredient`, only the drinks whose recipe has an ingredient of that name are returned.
+        """
+        query = cls.query.order_by(cls.id)
+        if set(fields) != set(DRINK_FIELDS):
+            query = query.options(load_only(*[getattr(cls, field) for field in fields]))
+        if ingredient is not None:
+            query = query.filter(cls.recipe.contains([{'name': ingredient}]))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        if limit is None:
+            return query.all(), None
+
+        # Fetch one extra row to know whether there is a next page
+        drinks = query.limit(limit + 1).all()
+        if len(drinks) > limit:
+            drinks = drinks[:limit]
+            return drinks, drinks[-1].id
+        return drinks, None
+
+    @classmethod
+    def export_rows(cls, batch_size=DRINK_BULK_BATCH_SIZE):
+        """
+        Yields (id, title, recipe as JSON text) for every drink ordered by id, through a server-side cursor
+        that fetches `batch_size` rows at a time, so memory use does not grow with the table
+        """
+        return db.session.query(cls.id, cls.title, cast(cls.recipe, Text)) \
+            .order_by(cls.id) \
+            .execution_options(stream_results=True) \
+            .yield_per(batch_size)
+
+    @classmethod
+    def bulk_upsert(cls, drinks, batch_size=DRINK_BULK_BATCH_SIZE):
+        """
+        Inserts many drinks, or updates the recipe of those whose title already exists, in a single
+        transaction with one multi-row INSERT ... ON CONFLICT (title) DO UPDATE per batch.
+        Titles must be unique within `drinks`.
+
+        EXAMPLE
+            results = Drink.bulk_upsert([{'title': 'Water', 'recipe': [...]}, ...])
+            drink_id, created = results['Water']
+        """
+        results = {}
+        try:
+            for start in range(0, len(drinks), batch_size):
+                statement = pg_insert(cls.__table__).values(drinks[start:start + batch_size])
+                statement = statement.on_conflict_do_update(
+                    index_elements=[cls.__table__.c.title],
+                    set_={'recipe': statement.excluded.recipe}
+                ).returning(
+                    cls.__table__.c.id,
+                    cls.__table__.c.title,
+                    # xmax is only set on rows that already existed and got updated
+                    literal_column('xmax = 0').label('created')
+                )
+                for row in db.session.execute(statement):
+                    results[row.title] = (row.id, row.created)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        data_version.bump()
+        return results
+
+    def _format(self, fields, recipe):
+        drink = {}
+        if 'id' in fields:
+            drink['id'] = self.id
+        if 'title' in fields:
+            drink['title'] = self.title
+        if 'recipe' in fields:
+            drink['recipe'] = recipe()
+        return drink
 
     '''
         short()
             short form representation of the Drink model
         '''
 
-    def short(self):
-        print(json.loads(self.recipe))
-        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': short_recipe
-        }
+    def short(self, fields=DRINK_FIELDS):
+        return self._format(
+            fields,
+            lambda: [{'color': r['color'], 'parts': r['parts']} for r in self.recipe]
+        )
 
     '''
     long()
         long form representation of the Drink model
     '''
 
-    def long(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': json.loads(self.recipe)
-        }
+    def long(self, fields=DRINK_FIELDS):
+        return self._format(fields, lambda: self.recipe)
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedBody:
+    def __init__(self, body, version):
+        self.body = body
+        self.version = version
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.created_at = time.monotonic()
+
+
+class BuildLock:
+    """The lock of a key being rebuilt, dropped once no thread waits for it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+
+class ResponseCache:
+    """
+    Keeps serialized response bodies in memory until the data version they were built from changes
+
+    The version only tracks writes made by this process, so entries also expire after `ttl` seconds
+    to bound how long other workers' writes can go unseen. A `ttl` of 0 disables the cache.
+    At most `maxsize` bodies are kept, the least recently used ones are dropped first.
+    """
+
+    def __init__(self, data_version, ttl=5, maxsize=256):
+        self.data_version = data_version
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key being rebuilt, so a burst of requests for a key after a write hits the database once,
+        # while other keys are rebuilt in parallel
+        self._build_locks = {}
+
+    def get(self, key, build):
+        """
+        Returns the cached body for `key`, calling `build()` to serialize a fresh one if needed
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._is_fresh(entry):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+
+            build_lock = self._build_locks.get(key)
+            if build_lock is None:
+                build_lock = self._build_locks[key] = BuildLock()
+            build_lock.waiters += 1
+
+        try:
+            with build_lock.lock:
+                # Another thread may have rebuilt it while we waited
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if self._is_fresh(entry):
+                        self.hits += 1
+                        return entry
+                    self.misses += 1
+
+                # Read the version first: a write landing during build() leaves the entry outdated, not wrong
+                version = self.data_version.value
+                entry = CachedBody(build(), version)
+                if self.ttl:
+                    with self._lock:
+                        self._entries[key] = entry
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.maxsize:
+                            self._entries.popitem(last=False)
+                return entry
+        finally:
+            with self._lock:
+                build_lock.waiters -= 1
+                if not build_lock.waiters:
+                    del self._build_locks[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_fresh(self, entry):
+        return entry is not None and \
+            entry.version == self.data_version.value and \
+            time.monotonic() - entry.created_at < self.ttl
@@ -0,0 +1,283 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from auth_core.testing import LocalSigningKey
+
+import config
+
+# Tokens are verified against a key generated here instead of the Auth0 key set. The tests run against the scratch
+# Postgres database at TEST_DATABASE_URL, as the drinks table needs JSONB.
+signing_key = LocalSigningKey()
+key_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+json.dump(signing_key.jwks, key_file)
+key_file.close()
+config.AUTH_KEY_FILE = key_file.name
+config.SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'TEST_DATABASE_URL', 'postgresql://postgres@localhost:5432/coffeeshop_test'
+)
+
+from api import create_app
+from models import db, data_version, Drink
+
+app = create_app()
+
+MANAGER = ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks']
+
+
+def auth_headers(permissions=MANAGER, **headers):
+    token = signing_key.mint(
+        permissions, iss=f'https://{config.AUTH0_DOMAIN}/', aud=config.API_AUDIENCE, sub='auth0|manager'
+    )
+    return dict(headers, Authorization=f'Bearer {token}')
+
+
+def recipe(name='milk', color='white', parts=1):
+    return [{'name': name, 'color': color, 'parts': parts}]
+
+
+class CoffeeShopTestCase(unittest.TestCase):
+    """This class represents the coffee shop API test case"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        # Listings cached by a previous test are outdated
+        data_version.bump()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_drinks(self, *titles):
+        ids = []
+        for title in titles:
+            drink = Drink(title=title, recipe=recipe())
+            drink.insert()
+            ids.append(drink.id)
+        return ids
+
+
+class ListingTestCase(CoffeeShopTestCase):
+    """This class represents the drink listing test case"""
+
+    def test_get_drinks(self):
+        self.add_drinks('Latte')
+
+        response = self.client.get('/drinks')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            'success': True,
+            'drinks': [{'id': 1, 'title': 'Latte', 'recipe': [{'color': 'white', 'parts': 1}]}],
+            'next_after': None
+        })
+        self.assertIn('public', response.headers['Cache-Control'])
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+    def test_drinks_detail_requires_a_token(self):
+        self.add_drinks('Latte')
+
+        self.assertEqual(self.client.get('/drinks-detail').status_code, 401)
+        response = self.client.get('/drinks-detail', headers=auth_headers(['post:drinks']))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['description'], 'Permission not found.')
+
+        response = self.client.get('/drinks-detail', headers=auth_headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['drinks'][0]['recipe'], recipe())
+        self.assertIn('private', response.headers['Cache-Control'])
+
+    def test_pages_follow_next_after(self):
+        ids = self.add_drinks('Americano', 'Cappuccino', 'Espresso')
+
+        first = self.client.get('/drinks?limit=2').get_json()
+        self.assertEqual([drink['id'] for drink in first['drinks']], ids[:2])
+        self.assertEqual(first['next_after'], ids[1])
+
+        last = self.client.get(f'/drinks?limit=2&after={first["next_after"]}').get_json()
+        self.assertEqual([drink['id'] for drink in last['drinks']], ids[2:])
+        self.assertIsNone(last['next_after'])
+
+        # A page that ends exactly with the last drink has no next page either
+        self.assertIsNone(self.client.get('/drinks?limit=3').get_json()['next_after'])
+
+    def test_fields_and_ingredient(self):
+        Drink(title='Mocha', recipe=recipe('chocolate', 'brown')).insert()
+        self.add_drinks('Latte')
+
+        response = self.client.get('/drinks?fields=title,unknown&ingredient=chocolate')
+
+        self.assertEqual(response.get_json()['drinks'], [{'title': 'Mocha'}])
+
+    def test_invalid_listing_args(self):
+        for query, description in (
+                ('limit=abc', 'after and limit must be integers'),
+                ('after=1.5', 'after and limit must be integers'),
+                ('limit=0', 'limit must be between 1 and 100'),
+                ('limit=101', 'limit must be between 1 and 100'),
+                ('fields=name,color', 'fields must be some of id, title, recipe')):
+            with self.subTest(query=query):
+                response = self.client.get(f'/drinks?{query}')
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json()['description'], description)
+
+
+class CachingTestCase(CoffeeShopTestCase):
+    """This class represents the drink listing ETag test case"""
+
+    def assertRevalidates(self, etag, changed):
+        response = self.client.get('/drinks-detail', headers=auth_headers(**{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 200 if changed else 304)
+        return response
+
+    def test_unchanged_listing_is_not_modified(self):
+        self.add_drinks('Latte')
+        response = self.client.get('/drinks', headers={'If-None-Match': '"outdated"'})
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        response = self.client.get('/drinks', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_writes_invalidate_the_listing(self):
+        drink_id, = self.add_drinks('Latte')
+        etag = self.client.get('/drinks-detail', headers=auth_headers()).headers['ETag']
+        self.assertRevalidates(etag, changed=False)
+
+        response = self.client.post('/drinks', json={'title': 'Mocha', 'recipe': recipe()}, headers=auth_headers())
+        self.assertEqual(response.status_code, 200)
+        response = self.assertRevalidates(etag, changed=True)
+        self.assertEqual([drink['title'] for drink in response.get_json()['drinks']], ['Latte', 'Mocha'])
+        etag = response.headers['ETag']
+
+        response = self.client.patch(f'/drinks/{drink_id}', json={'title': 'Flat White'}, headers=auth_headers())
+        self.assertEqual(response.status_code, 200)
+        response = self.assertRevalidates(etag, changed=True)
+        self.assertEqual([drink['title'] for drink in response.get_json()['drinks']], ['Flat White', 'Mocha'])
+        etag = response.headers['ETag']
+
+        response = self.client.delete(f'/drinks/{drink_id}', headers=auth_headers())
+        self.assertEqual(response.status_code, 200)
+        response = self.assertRevalidates(etag, changed=True)
+        self.assertEqual([drink['title'] for drink in response.get_json()['drinks']], ['Mocha'])
+
+
+class WritingTestCase(CoffeeShopTestCase):
+    """This class represents the drink creation and update test case"""
+
+    def test_create_drink(self):
+        response = self.client.post('/drinks', json={'title': ' Latte ', 'recipe': recipe()}, headers=auth_headers())
+
+        self.assertEqual(response.get_json(), {
+            'success': True,
+            'drinks': [{'id': 1, 'title': 'Latte', 'recipe': recipe()}]
+        })
+
+    def test_invalid_drink_reports_every_field(self):
+        body = '{"title": "", "recipe": [{"name": "milk", "color": "white", "parts": NaN}]}'
+
+        response = self.client.post('/drinks', data=body, content_type='application/json', headers=auth_headers())
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.get_json()['errors'], {
+            'title': 'must not be empty',
+            'recipe[0].parts': 'must be a finite number'
+        })
+
+    def test_patch_unknown_drink(self):
+        response = self.client.patch('/drinks/1', json={'title': 'Latte'}, headers=auth_headers())
+
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkTestCase(CoffeeShopTestCase):
+    """This class represents the bulk drink import test case"""
+
+    def test_bulk_results(self):
+        latte_id, = self.add_drinks('Latte')
+
+        response = self.client.post('/drinks/bulk', json=[
+            {'title': 'Mocha', 'recipe': recipe('chocolate', 'brown')},
+            {'title': 'Latte', 'recipe': recipe(parts=2)},
+            {'title': 'Mocha', 'recipe': recipe()},
+            {'title': 'Water'}
+        ], headers=auth_headers())
+
+        body = response.get_json()
+        self.assertEqual((body['created'], body['updated'], body['failed']), (1, 1, 2))
+        mocha, latte, duplicate, invalid = body['results']
+        self.assertEqual(mocha, {'index': 0, 'success': True, 'title': 'Mocha', 'id': mocha['id'], 'created': True})
+        self.assertEqual(latte, {'index': 1, 'success': True, 'title': 'Latte', 'id': latte_id, 'created': False})
+        self.assertEqual(duplicate, {'index': 2, 'success': False, 'description': 'Duplicate title in this request'})
+        self.assertEqual(invalid['errors'], {'recipe': 'is required'})
+        self.assertFalse(invalid['success'])
+
+        self.assertEqual(Drink.query.get(latte_id).recipe, recipe(parts=2))
+        self.assertEqual(Drink.query.get(mocha['id']).recipe, recipe('chocolate', 'brown'))
+
+    def test_bulk_ndjson(self):
+        lines = [json.dumps({'title': 'Mocha', 'recipe': recipe()}), '', '{"title": "Latte",', json.dumps([])]
+
+        response = self.client.post(
+            '/drinks/bulk', data='\n'.join(lines) + '\n', content_type='application/x-ndjson', headers=auth_headers()
+        )
+
+        body = response.get_json()
+        self.assertEqual((body['created'], body['updated'], body['failed']), (1, 0, 2))
+        self.assertEqual(body['results'][1], {'index': 1, 'success': False, 'description': 'Not a valid JSON drink'})
+        self.assertEqual(body['results'][2]['errors'], {'body': 'must be an object'})
+
+    def test_bulk_requires_an_array(self):
+        response = self.client.post('/drinks/bulk', json={'title': 'Mocha'}, headers=auth_headers())
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_requires_post_and_patch(self):
+        response = self.client.post('/drinks/bulk', json=[], headers=auth_headers(['post:drinks']))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['description'], 'Permission not found.')
+
+
+class ExportTestCase(CoffeeShopTestCase):
+    """This class represents the drink export test case"""
+
+    def setUp(self):
+        super().setUp()
+        # Enough drinks for several chunks of 1000
+        Drink.bulk_upsert([{'title': f'Drink {i}', 'recipe': recipe(parts=i % 100 + 1)} for i in range(2500)])
+
+    def test_export_ndjson_in_chunks(self):
+        response = self.client.get('/drinks/export', headers=auth_headers(), buffered=False)
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertNotIn('Content-Encoding', response.headers)
+        chunks = list(response.iter_encoded())
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [1000, 1000, 500])
+
+        drinks = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual(drinks[0], {'id': 1, 'title': 'Drink 0', 'recipe': recipe()})
+        self.assertEqual([drink['id'] for drink in drinks], list(range(1, 2501)))
+
+    def test_export_gzip(self):
+        plain = self.client.get('/drinks/export', headers=auth_headers()).data
+
+        response = self.client.get('/drinks/export', headers=auth_headers(**{'Accept-Encoding': 'gzip'}))
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.data), plain)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+
+from models import DataVersion
+from response_cache import ResponseCache
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """This class represents the drink listing cache test case"""
+
+    def setUp(self):
+        self.data_version = DataVersion()
+        self.builds = 0
+
+    def build(self, body=b'[]'):
+        self.builds += 1
+        return body
+
+    def test_hit_until_the_version_changes(self):
+        cache = ResponseCache(self.data_version)
+
+        first = cache.get('drinks', self.build)
+        self.assertIs(cache.get('drinks', self.build), first)
+        self.assertEqual((self.builds, cache.hits, cache.misses), (1, 1, 1))
+
+        self.data_version.bump()
+        self.assertIsNot(cache.get('drinks', self.build), first)
+        self.assertEqual(self.builds, 2)
+
+    def test_etag_follows_the_body(self):
+        cache = ResponseCache(self.data_version)
+
+        etag = cache.get('drinks', lambda: b'[1]').etag
+        self.data_version.bump()
+        self.assertEqual(cache.get('drinks', lambda: b'[1]').etag, etag)
+        self.data_version.bump()
+        self.assertNotEqual(cache.get('drinks', lambda: b'[2]').etag, etag)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(self.data_version, ttl=0.05)
+
+        cache.get('drinks', self.build)
+        time.sleep(0.1)
+        cache.get('drinks', self.build)
+        self.assertEqual(self.builds, 2)
+
+    def test_ttl_0_disables_the_cache(self):
+        cache = ResponseCache(self.data_version, ttl=0)
+
+        cache.get('drinks', self.build)
+        cache.get('drinks', self.build)
+        self.assertEqual(self.builds, 2)
+
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = ResponseCache(self.data_version, maxsize=2)
+
+        cache.get('a', self.build)
+        cache.get('b', self.build)
+        cache.get('a', self.build)
+        cache.get('c', self.build)
+        self.assertEqual(self.builds, 3)
+
+        cache.get('a', self.build)
+        self.assertEqual(self.builds, 3)
+        cache.get('b', self.build)
+        self.assertEqual(self.builds, 4)
+
+    def test_concurrent_misses_of_a_key_build_once(self):
+        cache = ResponseCache(self.data_version)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            return self.build()
+
+        threads = [threading.Thread(target=cache.get, args=('drinks', slow_build)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        # Every thread missed and waits for the one building
+        deadline = time.monotonic() + 5
+        while cache._build_locks['drinks'].waiters < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache._build_locks, {})
+
+    def test_keys_are_built_in_parallel(self):
+        cache = ResponseCache(self.data_version)
+        release = threading.Event()
+
+        def blocked_build():
+            release.wait(5)
+            return self.build()
+
+        thread = threading.Thread(target=cache.get, args=('drinks', blocked_build))
+        thread.start()
+        try:
+            # Not held up by the rebuild of another key
+            started = time.monotonic()
+            cache.get('drinks-detail', self.build)
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            release.set()
+            thread.join(5)
+
+        self.assertEqual(self.builds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
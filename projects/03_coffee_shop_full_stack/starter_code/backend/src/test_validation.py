@@ -0,0 +1,95 @@
+import unittest
+
+from validation import ValidationError, Object, List, String, Number, format_path
+
+SCHEMA = Object({
+    'title': String(max_length=10),
+    'recipe': List(Object({
+        'name': String(),
+        'parts': Number(minimum=1, maximum=100)
+    }), max_items=2),
+    'note': String(required=False)
+})
+
+
+class ValidationTestCase(unittest.TestCase):
+    """This class represents the payload validation test case"""
+
+    def assertErrors(self, payload, errors, partial=False):
+        with self.assertRaises(ValidationError) as raised:
+            SCHEMA.validate(payload, partial=partial)
+        self.assertEqual(raised.exception.errors, errors)
+
+    def test_valid_payload_is_cleaned(self):
+        cleaned = SCHEMA.validate({
+            'title': '  Water ',
+            'recipe': [{'name': 'water', 'parts': 1, 'color': 'blue'}],
+            'unknown': True
+        })
+
+        self.assertEqual(cleaned, {'title': 'Water', 'recipe': [{'name': 'water', 'parts': 1}]})
+
+    def test_numeric_strings_are_converted(self):
+        cleaned = SCHEMA.validate({'title': 'Water', 'recipe': [{'name': 'water', 'parts': '2'}]})
+        self.assertEqual(cleaned['recipe'][0]['parts'], 2)
+
+        cleaned = SCHEMA.validate({'title': 'Water', 'recipe': [{'name': 'water', 'parts': '2.5'}]})
+        self.assertEqual(cleaned['recipe'][0]['parts'], 2.5)
+
+    def test_every_error_is_reported_by_path(self):
+        self.assertErrors({'title': '', 'recipe': [{'name': 3, 'parts': 'two'}, {'parts': 0}]}, {
+            'title': 'must not be empty',
+            'recipe[0].name': 'must be a string',
+            'recipe[0].parts': 'must be a number',
+            'recipe[1].name': 'is required',
+            'recipe[1].parts': 'must be at least 1'
+        })
+
+    def test_missing_and_mistyped_fields(self):
+        self.assertErrors({}, {'title': 'is required', 'recipe': 'is required'})
+        self.assertErrors({'title': 'Water', 'recipe': {}}, {'recipe': 'must be a list'})
+        self.assertErrors({'title': 'Water', 'recipe': ['water']}, {'recipe[0]': 'must be an object'})
+        self.assertErrors([], {'body': 'must be an object'})
+
+    def test_bounds(self):
+        self.assertErrors({'title': 'A very long title', 'recipe': []}, {
+            'title': 'must be at most 10 characters long',
+            'recipe': 'must have at least 1 item(s)'
+        })
+        recipe = [{'name': 'water', 'parts': 101}] * 3
+        self.assertErrors({'title': 'Water', 'recipe': recipe}, {
+            'recipe': 'must have at most 2 items',
+            'recipe[0].parts': 'must be at most 100',
+            'recipe[1].parts': 'must be at most 100',
+            'recipe[2].parts': 'must be at most 100'
+        })
+
+    def test_booleans_are_not_numbers(self):
+        self.assertErrors({'title': 'Water', 'recipe': [{'name': 'water', 'parts': True}]},
+                          {'recipe[0].parts': 'must be a number'})
+
+    def test_non_finite_numbers_are_rejected(self):
+        for parts in (float('nan'), float('inf'), float('-inf'), '1.5e400'):
+            with self.subTest(parts=parts):
+                self.assertErrors({'title': 'Water', 'recipe': [{'name': 'water', 'parts': parts}]},
+                                  {'recipe[0].parts': 'must be a finite number'})
+
+        # Numbers too large for a float are not compared as floats
+        self.assertErrors({'title': 'Water', 'recipe': [{'name': 'water', 'parts': 10 ** 400}]},
+                          {'recipe[0].parts': 'must be at most 100'})
+
+    def test_partial_allows_missing_fields(self):
+        self.assertEqual(SCHEMA.validate({'title': 'Water'}, partial=True), {'title': 'Water'})
+        self.assertEqual(SCHEMA.validate({}, partial=True), {})
+
+    def test_partial_still_checks_sent_fields(self):
+        self.assertErrors({'recipe': [{'parts': 1}]}, {'recipe[0].name': 'is required'}, partial=True)
+        self.assertErrors({'title': ''}, {'title': 'must not be empty'}, partial=True)
+
+    def test_format_path(self):
+        self.assertEqual(format_path(None), 'body')
+        self.assertEqual(format_path((((None, 'recipe'), 0), 'name')), 'recipe[0].name')
+
+
+if __name__ == "__main__":
+    unittest.main()
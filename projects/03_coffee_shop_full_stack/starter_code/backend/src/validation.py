@@ -0,0 +1,174 @@
+"""
+Declarative validation of JSON payloads
+
+A schema is declared once with String, Number, List and Object fields and compiled into plain checking
+functions when it is built, so validating a payload does not interpret the schema again. Validation collects
+every error instead of stopping at the first one.
+
+EXAMPLE
+    schema = Object({
+        'title': String(max_length=80),
+        'recipe': List(Object({'name': String(), 'parts': Number(minimum=1)}), max_items=5)
+    })
+    drink_data = schema.validate(request.get_json())
+"""
+import math
+
+
+class ValidationError(Exception):
+    """
+    Raised with every error found in a payload, as a mapping of field path -> message
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def format_path(path):
+    """
+    Formats a path of nested (parent, key) pairs as e.g. recipe[0].name. Paths are only formatted when an error is
+    recorded, so valid payloads never pay for building them.
+    """
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(f'[{key}]' if isinstance(key, int) else f'.{key}')
+    return ''.join(reversed(keys)).lstrip('.') or 'body'
+
+
+class Field:
+    def __init__(self, required=True):
+        self.required = required
+
+    def compile(self):
+        """
+        Returns a function (value, path, errors) -> cleaned value, recording errors by formatted path
+        """
+        raise NotImplementedError
+
+
+class String(Field):
+    def __init__(self, min_length=1, max_length=None, strip=True, required=True):
+        super().__init__(required)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.strip = strip
+
+    def compile(self):
+        min_length, max_length, strip = self.min_length, self.max_length, self.strip
+
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                errors[format_path(path)] = 'must be a string'
+                return None
+            if strip:
+                value = value.strip()
+            if len(value) < min_length:
+                errors[format_path(path)] = 'must not be empty' if min_length == 1 else \
+                    f'must be at least {min_length} characters long'
+            elif max_length is not None and len(value) > max_length:
+                errors[format_path(path)] = f'must be at most {max_length} characters long'
+            return value
+
+        return check
+
+
+class Number(Field):
+    """
+    A finite number, numeric strings (as sent by HTML number inputs) are converted. NaN and infinities, which
+    Python's JSON parser accepts, are rejected as they would pass any range check.
+    """
+
+    def __init__(self, minimum=None, maximum=None, required=True):
+        super().__init__(required)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def compile(self):
+        minimum, maximum = self.minimum, self.maximum
+
+        def check(value, path, errors):
+            if isinstance(value, str):
+                try:
+                    value = float(value) if '.' in value else int(value)
+                except ValueError:
+                    pass
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors[format_path(path)] = 'must be a number'
+                return None
+            if isinstance(value, float) and not math.isfinite(value):
+                errors[format_path(path)] = 'must be a finite number'
+                return None
+            if minimum is not None and value < minimum:
+                errors[format_path(path)] = f'must be at least {minimum}'
+            elif maximum is not None and value > maximum:
+                errors[format_path(path)] = f'must be at most {maximum}'
+            return value
+
+        return check
+
+
+class List(Field):
+    def __init__(self, items, min_items=1, max_items=None, required=True):
+        super().__init__(required)
+        self.items = items
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def compile(self):
+        check_item, min_items, max_items = self.items.compile(), self.min_items, self.max_items
+
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                errors[format_path(path)] = 'must be a list'
+                return None
+            if len(value) < min_items:
+                errors[format_path(path)] = f'must have at least {min_items} item(s)'
+            elif max_items is not None and len(value) > max_items:
+                errors[format_path(path)] = f'must have at most {max_items} items'
+            return [check_item(item, (path, index), errors) for index, item in enumerate(value)]
+
+        return check
+
+
+class Object(Field):
+    """
+    An object with the given fields. Keys that are not declared are dropped.
+    """
+
+    def __init__(self, fields, required=True):
+        super().__init__(required)
+        self.fields = fields
+        self._check = self.compile()
+        self._check_partial = self.compile(partial=True)
+
+    def compile(self, partial=False):
+        checks = tuple(
+            (name, field.required and not partial, field.compile()) for name, field in self.fields.items()
+        )
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors[format_path(path)] = 'must be an object'
+                return None
+            cleaned = {}
+            for name, required, check_field in checks:
+                if name in value:
+                    cleaned[name] = check_field(value[name], (path, name), errors)
+                elif required:
+                    errors[format_path((path, name))] = 'is required'
+            return cleaned
+
+        return check
+
+    def validate(self, value, partial=False):
+        """
+        Returns the cleaned payload, or raises ValidationError with every error found.
+        With `partial`, missing fields are allowed (e.g. for PATCH requests).
+        """
+        errors = {}
+        cleaned = (self._check_partial if partial else self._check)(value, None, errors)
+        if errors:
+            raise ValidationError(errors)
+        return cleaned
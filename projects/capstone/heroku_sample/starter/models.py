@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, create_engine
+import os
+from sqlalchemy import Column, String, Integer, create_engine
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+from db_core import configure_db
+
 database_path = os.environ['DATABASE_URL']
 
 db = SQLAlchemy()
@@ -9,13 +12,11 @@ db = SQLAlchemy()
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    the pool is configured with the DB_* environment variables (see db_core). The sample has no migrations,
+    so missing tables are created on startup.
 '''
 def setup_db(app, database_path=database_path):
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_path
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.app = app
-    db.init_app(app)
-    db.create_all()
+    configure_db(app, db, database_path, create_tables=True)
 
 
 '''
@@ -0,0 +1,14 @@
+"""
+Installs the packages shared by the apps of this repository, auth_core and db_core
+
+Each app installs them with an editable entry in its requirements.txt, e.g. `-e ../../..`, so they are imported like
+any other dependency. Their own dependencies (SQLAlchemy, python-jose) are pinned by the apps.
+"""
+from setuptools import setup
+
+setup(
+    name='fsnd-core',
+    version='1.0.0',
+    description='Token verification and database engine setup shared by the FSND apps',
+    packages=['auth_core', 'db_core']
+)